@@ -0,0 +1,589 @@
+import asyncio
+import json
+import inspect
+import time
+from urllib.parse import urlencode
+import aiohttp
+from exceptions import BinanceAPIException, BinanceRequestException, BinanceOrderException
+from binance_lite import BinanceLite
+from symbol_info import SymbolInfoCache
+import signing
+import decoding
+from log import NullLog
+from ratelimit import get_limiter
+
+
+class _Response(object):
+    """Read response of aiohttp, with the attributes that BinanceAPIException expects
+    from a requests response.
+    """
+
+    def __init__(self, status_code, headers, content, request=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.request = request
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+class AsyncBinanceLite(object):
+    """asyncio version of BinanceLite. Public methods have the same names, params and results,
+    but are coroutines. Many requests can be in flight at once on one event loop.
+
+    api_url, and the signer client host and port, can point to local stand-ins for testing.
+    Call close() when done.
+    """
+    API_KEY = BinanceLite.API_KEY
+
+    PUBLIC_API_VERSION = BinanceLite.PUBLIC_API_VERSION
+    PRIVATE_API_VERSION = BinanceLite.PRIVATE_API_VERSION
+    API_URL = BinanceLite.API_URL
+
+    RECV_WINDOW = BinanceLite.RECV_WINDOW
+
+    SIDE_BUY = BinanceLite.SIDE_BUY
+    SIDE_SELL = BinanceLite.SIDE_SELL
+
+    ORDER_TYPE_LIMIT = BinanceLite.ORDER_TYPE_LIMIT
+    ORDER_TYPE_MARKET = BinanceLite.ORDER_TYPE_MARKET
+    ORDER_TYPE_LIMIT_MAKER = BinanceLite.ORDER_TYPE_LIMIT_MAKER
+
+    SYMBOL_BTCUSDT = BinanceLite.SYMBOL_BTCUSDT
+
+    def __init__(self, log=None, signer=None, api_url=API_URL, session=None, limiter=None, clock=None):
+        """
+        :param log: log.Log instance, default: no logging
+        :param signer: signing.SignerBackend, sign may be a coroutine, default: signing.AsyncRemoteSigner
+        :param api_url: base url of the REST API
+        :param session: aiohttp.ClientSession to use, created on first request if not set
+        :param limiter: ratelimit.RateLimiter, default: the one shared by the process
+        :param clock: clock.ClockSync, e.g. the running one of a BinanceLite, for timestamps and recvWindow
+        """
+        self.log = log if log is not None else NullLog()
+        self.signer = signer if signer is not None else signing.AsyncRemoteSigner()
+        self.limiter = limiter if limiter is not None else get_limiter()
+        self.symbol_info = _AsyncSymbolInfoCache(self)
+        self.api_url = api_url
+        self._requests_params = None
+        self.session = session
+        self.clock = clock
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def ping(self):
+        """See BinanceLite.ping"""
+        try:
+            start = time.time()
+            pong = await self._get('ping')
+            stop = time.time()
+            if pong == {}:
+                return 'pong time: {}'.format(stop - start)
+            else:
+                return False
+        except Exception as ex:
+            print(ex)
+            return False
+
+    async def get_order_book(self, as_array=False, **params):
+        """See BinanceLite.get_order_book"""
+        try:
+            order_book = await self._get('depth', data=params, decoder=decoding.decode_depth if as_array else None)
+            if order_book:
+                return [True, order_book]
+            else:
+                return [False, 'Empty order book.']
+        except Exception as ex:
+            print('get_order_book error: \'{}\''.format(ex))
+            return [False, ex]
+
+    async def get_assets_balance(self, **params):
+        """See BinanceLite.get_assets_balance"""
+        try:
+            res = await self.get_account(**params)
+        except Exception as ex:
+            print('get assets error: {}'.format(ex))
+            return [False, ex]
+        return BinanceLite._assets_balance(res)
+
+    async def get_open_orders(self, **params):
+        """See BinanceLite.get_open_orders"""
+        params['recvWindow'] = self._recv_window()
+        return await self._get('openOrders', True, data=params)
+
+    async def limit_buy(self, usd_amount, price):
+        """See BinanceLite.limit_buy"""
+        try:
+            symbol_info = await self.get_symbol_info(self.SYMBOL_BTCUSDT)
+            order = symbol_info.check_limit_order(usd_amount / price, price)
+        except Exception as ex:
+            return self._order_check_error(ex)
+        return await self._order_result(self.create_order(symbol=self.SYMBOL_BTCUSDT,
+                                                          type=self.ORDER_TYPE_LIMIT_MAKER,
+                                                          side=self.SIDE_BUY,
+                                                          **order))
+
+    async def limit_sell(self, btc_amount, price):
+        """See BinanceLite.limit_sell"""
+        try:
+            symbol_info = await self.get_symbol_info(self.SYMBOL_BTCUSDT)
+            order = symbol_info.check_limit_order(btc_amount, price)
+        except Exception as ex:
+            return self._order_check_error(ex)
+        return await self._order_result(self.create_order(symbol=self.SYMBOL_BTCUSDT,
+                                                          type=self.ORDER_TYPE_LIMIT_MAKER,
+                                                          side=self.SIDE_SELL,
+                                                          **order))
+
+    async def market_buy(self, usd_amount):
+        """See BinanceLite.market_buy"""
+        try:
+            symbol_info = await self.get_symbol_info(self.SYMBOL_BTCUSDT)
+            order = symbol_info.check_market_order(quote_quantity=usd_amount)
+            info = await self.create_order(symbol=self.SYMBOL_BTCUSDT,
+                                           type=self.ORDER_TYPE_MARKET,
+                                           side=self.SIDE_BUY,
+                                           **order)
+            if info:
+                return {'result': True, 'info': info}
+            else:
+                return {'result': False, 'info': 'Signing error.'}
+        except BinanceOrderException as ex:
+            return BinanceLite._order_error_result(ex)
+        except Exception as ex:
+            return {'result': False, 'info': str(ex)}
+
+    async def market_sell(self, btc_amount):
+        """See BinanceLite.market_sell"""
+        try:
+            symbol_info = await self.get_symbol_info(self.SYMBOL_BTCUSDT)
+            order = symbol_info.check_market_order(quantity=btc_amount)
+            info = await self.create_order(symbol=self.SYMBOL_BTCUSDT,
+                                           type=self.ORDER_TYPE_MARKET,
+                                           side=self.SIDE_SELL,
+                                           **order)
+            if info:
+                return {'result': True, 'info': info}
+            else:
+                return {'result': False, 'info': 'Signing error.'}
+        except BinanceOrderException as ex:
+            return BinanceLite._order_error_result(ex)
+        except Exception as ex:
+            return {'result': False, 'info': str(ex)}
+
+    async def market_test_buy(self, usd_amount):
+        """See BinanceLite.market_test_buy"""
+        try:
+            symbol_info = await self.get_symbol_info(self.SYMBOL_BTCUSDT)
+            order = symbol_info.check_market_order(quote_quantity=usd_amount)
+        except Exception as ex:
+            return self._order_check_error(ex)
+        return await self._order_result(self.create_test_order(symbol=self.SYMBOL_BTCUSDT,
+                                                               type=self.ORDER_TYPE_MARKET,
+                                                               side=self.SIDE_BUY,
+                                                               **order))
+
+    async def market_test_sell(self, btc_amount):
+        """See BinanceLite.market_test_sell"""
+        try:
+            symbol_info = await self.get_symbol_info(self.SYMBOL_BTCUSDT)
+            order = symbol_info.check_market_order(quantity=btc_amount)
+        except Exception as ex:
+            return self._order_check_error(ex)
+        result = await self._order_result(self.create_test_order(symbol=self.SYMBOL_BTCUSDT,
+                                                                 type=self.ORDER_TYPE_MARKET,
+                                                                 side=self.SIDE_SELL,
+                                                                 **order))
+        if result['result'] and not result['info']:
+            result = {'result': False, 'info': 'Signing error.'}
+        return result
+
+    async def get_exchange_info(self):
+        """See BinanceLite.get_exchange_info"""
+        return await self._get('exchangeInfo', version=self.PRIVATE_API_VERSION)
+
+    async def get_symbol_info(self, symbol):
+        """See BinanceLite.get_symbol_info"""
+        return await self.symbol_info.get(symbol)
+
+    async def create_order(self, **params):
+        """See BinanceLite.create_order"""
+        params['recvWindow'] = self._recv_window()
+        params['newOrderRespType'] = 'FULL'
+        return await self._post('order', True, data=params)
+
+    async def create_orders(self, orders):
+        """See BinanceLite.create_orders. Orders are sent concurrently."""
+        data_list = []
+        for params in orders:
+            params = dict(params)
+            params['recvWindow'] = self.RECV_WINDOW
+            params['newOrderRespType'] = 'FULL'
+            data_list.append(params)
+        return await self._request_batch('post', 'order', data_list)
+
+    async def create_test_order(self, **params):
+        """See BinanceLite.create_test_order"""
+        params['newOrderRespType'] = 'FULL'
+        params['recvWindow'] = self._recv_window()
+        return await self._post('order/test', True, data=params)
+
+    async def get_account(self, **params):
+        """See BinanceLite.get_account"""
+        params['recvWindow'] = self._recv_window()
+        return await self._get('account', True, data=params)
+
+    async def cancel_order(self, **params):
+        """See BinanceLite.cancel_order"""
+        params['recvWindow'] = self._recv_window()
+        return await self._delete('order', True, data=params)
+
+    async def cancel_orders(self, orders):
+        """See BinanceLite.cancel_orders. Cancels are sent concurrently."""
+        data_list = []
+        for params in orders:
+            params = dict(params)
+            params['recvWindow'] = self.RECV_WINDOW
+            data_list.append(params)
+        return await self._request_batch('delete', 'order', data_list)
+
+    async def cancel_all_open_orders(self, **params):
+        """See BinanceLite.cancel_all_open_orders"""
+        params['recvWindow'] = self._recv_window()
+        return await self._delete('openOrders', True, data=params)
+
+    async def get_price_line(self, start_str_or_float, interval, end_str_or_float=None, store=None, as_array=False):
+        """See BinanceLite.get_price_line"""
+        try:
+            if store is not None:
+                columns = await self.get_cached_klines(store, start_str_or_float=start_str_or_float,
+                                                       end_str_or_float=end_str_or_float, interval=interval)
+                if as_array:
+                    from kline_store import columns_to_price_line
+                    return False, columns_to_price_line(columns)
+                return False, BinanceLite._columns_price_line(columns)
+            if as_array:
+                # convert page by page, raw pages are not kept
+                import numpy as np
+                from kline_store import klines_to_price_line, PRICE_LINE_DTYPE
+                pages = [klines_to_price_line(page) async for page in
+                         self.iter_historical_klines(start_str_or_float=start_str_or_float,
+                                                     end_str_or_float=end_str_or_float, interval=interval,
+                                                     numeric=True)]
+                return False, np.concatenate(pages) if pages else np.empty(0, dtype=PRICE_LINE_DTYPE)
+            candles_1m = await self.get_historical_klines(start_str_or_float=start_str_or_float,
+                                                          end_str_or_float=end_str_or_float, interval=interval)
+        except Exception as ex:
+            return str(ex), False
+        return False, BinanceLite._price_line(candles_1m)
+
+    async def get_symbol_ticker(self, **params):
+        """See BinanceLite.get_symbol_ticker"""
+        try:
+            ticker = await self._get('ticker/price', data=params, version=self.PUBLIC_API_VERSION)
+        except Exception as ex:
+            print('Error: {}'.format(ex))
+            ticker = None
+        return ticker
+
+    async def get_historical_klines(self, interval, start_str_or_float, end_str_or_float=None,
+                                    symbol=SYMBOL_BTCUSDT, limit=1000):
+        """See BinanceLite.get_historical_klines"""
+        output_data = []
+        async for page in self.iter_historical_klines(interval, start_str_or_float, end_str_or_float, symbol, limit):
+            output_data += page
+        return output_data
+
+    async def iter_historical_klines(self, interval, start_str_or_float, end_str_or_float=None,
+                                     symbol=SYMBOL_BTCUSDT, limit=1000, numeric=False):
+        """See BinanceLite.iter_historical_klines, an async generator of pages"""
+        start_ts = BinanceLite._str_or_float_to_milliseconds(start_str_or_float)
+        first_valid_ts = await self._get_earliest_valid_timestamp(symbol, interval)
+        start_ts = max(start_ts, first_valid_ts)
+        end_ts = None
+        if end_str_or_float:
+            end_ts = BinanceLite._str_or_float_to_milliseconds(end_str_or_float)
+        decoder = decoding.decode_klines if numeric else None
+        async for page in self._iter_klines_range(symbol, interval, start_ts, end_ts, limit, decoder):
+            yield page
+
+    async def get_cached_klines(self, store, interval, start_str_or_float, end_str_or_float=None,
+                                symbol=SYMBOL_BTCUSDT, limit=1000):
+        """See BinanceLite.get_cached_klines"""
+        timeframe = BinanceLite._interval_to_milliseconds(interval)
+        start_ts = BinanceLite._str_or_float_to_milliseconds(start_str_or_float)
+        now_ts = int(time.time() * 1000)
+        end_ts = now_ts
+        if end_str_or_float:
+            end_ts = min(BinanceLite._str_or_float_to_milliseconds(end_str_or_float), now_ts)
+        # klines opened in the last interval may still change, never store them
+        closed_end_ts = min(end_ts, now_ts - timeframe)
+        if start_ts <= closed_end_ts:
+            for gap_start, gap_end in store.missing(symbol, interval, start_ts, closed_end_ts):
+                klines = await self._get_klines_range(symbol, interval, gap_start, gap_end, limit)
+                store.update(symbol, interval, klines, gap_start, gap_end)
+            columns = store.get(symbol, interval, start_ts, closed_end_ts)
+        else:
+            # only the open kline is asked for
+            from kline_store import klines_to_columns
+            columns = klines_to_columns([])
+        if end_ts > closed_end_ts:
+            recent = await self._get_klines_range(symbol, interval, max(start_ts, closed_end_ts + 1), end_ts, limit)
+            if recent:
+                columns = store.concat(columns, recent)
+        return columns
+
+    async def _get_klines_range(self, symbol, interval, start_ts, end_ts, limit=1000):
+        """See BinanceLite._get_klines_range"""
+        output_data = []
+        async for page in self._iter_klines_range(symbol, interval, start_ts, end_ts, limit):
+            output_data += page
+        return output_data
+
+    async def _iter_klines_range(self, symbol, interval, start_ts, end_ts, limit=1000, decoder=None):
+        """See BinanceLite._iter_klines_range, paced by the rate limiter"""
+        timeframe = BinanceLite._interval_to_milliseconds(interval)
+        while True:
+            temp_data = await self._get_klines(symbol=symbol,
+                                               interval=interval,
+                                               limit=limit,
+                                               startTime=start_ts,
+                                               endTime=end_ts,
+                                               decoder=decoder)
+            if not len(temp_data):
+                break
+            yield temp_data
+            start_ts = int(temp_data[-1][0])
+            if len(temp_data) < limit:
+                break
+            start_ts += timeframe
+
+    async def _get_klines(self, decoder=None, **params):
+        """See BinanceLite._get_klines"""
+        return await self._get('klines', data=params, decoder=decoder)
+
+    async def _get_earliest_valid_timestamp(self, symbol, interval):
+        kline = await self._get_klines(symbol=symbol,
+                                       interval=interval,
+                                       limit=1,
+                                       startTime=0,
+                                       endTime=None)
+        return kline[0][0]
+
+    async def _order_result(self, order):
+        try:
+            result = {'result': True, 'info': await order}
+        except BinanceAPIException as ex:
+            result = BinanceLite._order_error_result(ex)
+        except Exception as ex:
+            result = {'result': False, 'info': str(ex)}
+        return result
+
+    @staticmethod
+    def _order_check_error(ex):
+        """Order result of an error raised while loading the symbol info or checking the order."""
+        if isinstance(ex, BinanceOrderException):
+            return BinanceLite._order_error_result(ex)
+        return {'result': False, 'info': str(ex)}
+
+    def _init_session(self):
+        return aiohttp.ClientSession(headers={'Accept': 'application/json',
+                                              'User-Agent': 'binance/python',
+                                              'X-MBX-APIKEY': self.API_KEY})
+
+    async def _post(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
+        return await self._request_api('post', path, signed, version, **kwargs)
+
+    async def _get(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
+        return await self._request_api('get', path, signed, version, **kwargs)
+
+    async def _delete(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
+        return await self._request_api('delete', path, signed, version, **kwargs)
+
+    async def _request_api(self, method, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
+        uri = self._create_api_uri(path, signed, version)
+        return await self._request(method, uri, signed, **kwargs)
+
+    def _create_api_uri(self, path, signed=True, version=PUBLIC_API_VERSION):
+        v = self.PRIVATE_API_VERSION if signed else version
+        return self.api_url + '/' + v + '/' + path
+
+    async def _request(self, method, uri, signed, force_params=False, decoder=None, limit=True, **kwargs):
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=10)
+
+        if self._requests_params:
+            kwargs.update(self._requests_params)
+
+        data = kwargs.get('data', None)
+        if data and isinstance(data, dict):
+            kwargs['data'] = data
+            if 'requests_params' in kwargs['data']:
+                kwargs.update(kwargs['data']['requests_params'])
+                del(kwargs['data']['requests_params'])
+
+        if limit:
+            await self._acquire(method, uri[len(self.api_url) + 1:].split('/', 1)[-1], data)
+
+        if signed and 'signature' not in kwargs['data']:
+            kwargs['data']['timestamp'] = self._timestamp()
+            signature = await self._call_for_signature(kwargs['data'])
+            if not signature:
+                print('Signature error!')
+                return None
+            kwargs['data']['signature'] = signature
+
+        if data:
+            kwargs['data'] = BinanceLite._order_params(kwargs['data'])
+            kwargs['data'] = [(key, value) for key, value in kwargs['data'] if value is not None]
+            if method == 'get' or force_params:
+                kwargs['params'] = '&'.join('%s=%s' % (key, value) for key, value in kwargs['data'])
+                del(kwargs['data'])
+            else:
+                # same encoding as requests uses for form data
+                kwargs['data'] = urlencode(kwargs['data'])
+                kwargs['headers'] = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+        if self.session is None:
+            self.session = self._init_session()
+        async with self.session.request(method.upper(), uri, **kwargs) as response:
+            content = await response.read()
+            result = _Response(response.status, response.headers, content, response.request_info)
+        self.limiter.update(result)
+        try:
+            return self._handle_response(result, decoder)
+        except BinanceAPIException as ex:
+            if ex.code == -1021 and self.clock is not None:
+                # timestamp outside recvWindow, the clock estimate is off
+                self.clock.resync()
+            raise
+
+    def _timestamp(self):
+        # server time estimate of a running clock sync, local time otherwise
+        clock = self.clock
+        if clock is not None and clock.synced:
+            return clock.timestamp()
+        return int(time.time() * 1000)
+
+    def _recv_window(self):
+        # single requests only, batches share one timestamp and keep RECV_WINDOW
+        clock = self.clock
+        if clock is not None and clock.synced:
+            return clock.recv_window()
+        return self.RECV_WINDOW
+
+    async def _acquire(self, method, path, data=None):
+        """Wait for the weight, and the order count of orders, without blocking the loop."""
+        while not self.limiter.try_acquire(method, path, data):
+            await asyncio.sleep(max(self.limiter.blocked_for(), 0.05))
+
+    async def _request_batch(self, method, path, data_list):
+        """Sign requests in one round trip to the signer, then send them concurrently.
+
+        Requests go in chunks that fit the rate limiter budgets, see BinanceLite._request_batch.
+
+        :returns: list of [True, API response] or [False, error], in the order of data_list
+        """
+        uri = self._create_api_uri(path, True, self.PRIVATE_API_VERSION)
+        chunk_size = self.limiter.batch_size(method, path)
+        results = []
+        for i in range(0, len(data_list), chunk_size):
+            results += await self._request_chunk(method, uri, path, data_list[i:i + chunk_size])
+        return results
+
+    async def _request_chunk(self, method, uri, path, data_list):
+        data_list = [dict(data) for data in data_list]
+        # take the budgets first, so the timestamp does not age while waiting for them
+        for data in data_list:
+            await self._acquire(method, path, data)
+        timestamp = self._timestamp()
+        for data in data_list:
+            data['timestamp'] = timestamp
+        signatures = await self._call_for_signatures(data_list)
+        if not signatures:
+            print('Signature error!')
+            return [[False, 'Signature error!'] for _ in data_list]
+        for data, signature in zip(data_list, signatures):
+            data['signature'] = signature
+        responses = await asyncio.gather(*[self._request(method, uri, True, limit=False, data=data)
+                                           for data in data_list], return_exceptions=True)
+        return [[False, response] if isinstance(response, Exception) else [True, response]
+                for response in responses]
+
+    async def _call_for_signature(self, data):
+        query_string = BinanceLite._query_string(data)
+        self.log.append_specific(query_string)
+        try:
+            signature = await self._maybe_await(self.signer.sign(query_string))
+        except Exception as ex:
+            signature = None
+            error = str(ex)
+        else:
+            error = 'SIGNING ERROR.'
+        if signature:
+            self.log.append_specific('signature obtained.')
+        else:
+            self.log.append_general(error, is_error=True)
+            signature = False
+        return signature
+
+    async def _call_for_signatures(self, data_list):
+        query_strings = [BinanceLite._query_string(data) for data in data_list]
+        for query_string in query_strings:
+            self.log.append_specific(query_string)
+        try:
+            signatures = await self._maybe_await(self.signer.sign_batch(query_strings))
+        except Exception as ex:
+            signatures = None
+            error = str(ex)
+        else:
+            error = 'SIGNING ERROR.'
+        if signatures and all(signatures):
+            self.log.append_specific('{} signatures obtained.'.format(len(signatures)))
+        else:
+            self.log.append_general(error, is_error=True)
+            signatures = False
+        return signatures
+
+    @staticmethod
+    async def _maybe_await(result):
+        # local backends sign synchronously, remote ones return coroutines
+        if inspect.isawaitable(result):
+            return await result
+        return result
+
+    @staticmethod
+    def _handle_response(response, decoder=None):
+        if not str(response.status_code).startswith('2'):
+            raise BinanceAPIException(response)
+        try:
+            return (decoder or decoding.loads)(response.content)
+        except ValueError:
+            raise BinanceRequestException('Invalid Response: %s' % response.text)
+
+
+class _AsyncSymbolInfoCache(SymbolInfoCache):
+    """SymbolInfoCache of AsyncBinanceLite, exchangeInfo is loaded with await."""
+
+    def __init__(self, client, ttl=3600):
+        super(_AsyncSymbolInfoCache, self).__init__(client, ttl)
+        # created on first use, inside the event loop
+        self._async_lock = None
+
+    async def get(self, symbol):
+        """:return: SymbolInfo
+        :raises: BinanceOrderUnknownSymbolException, BinanceRequestException, BinanceAPIException
+        """
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if self._stale():
+                self._update(await self.client.get_exchange_info())
+        return self._lookup(symbol)
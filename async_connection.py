@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+import json
+import socket
+import protocol
+from connection import SIGNER_HOST, SIGNER_PORT
+from metrics import LatencyStats
+
+
+class AsyncSignerClient(object):
+    """asyncio counterpart of connection.SignerClient, uses the same framing and request ids,
+    so many coroutines can wait for signatures on one connection.
+    """
+
+    def __init__(self, host=SIGNER_HOST, port=SIGNER_PORT, timeout=6, retries=1, reconnect_delay=0.2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnect_delay = reconnect_delay
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = None
+        self.latency = LatencyStats()
+
+    async def sign(self, query_string):
+        """Get signature of query_string.
+
+        :return: hex signature
+        :raises: ConnectionError, asyncio.TimeoutError, protocol.ProtocolError, protocol.SignerError
+        """
+        payload = await self._call(protocol.OP_SIGN, query_string.encode())
+        with self.latency.timer('decode'):
+            return payload.decode()
+
+    async def sign_batch(self, query_strings):
+        """Get signatures of several query strings in one round trip.
+
+        :return: list of hex signatures in the order of query_strings
+        """
+        payload = await self._call(protocol.OP_SIGN_BATCH, protocol.pack_batch(query_strings))
+        with self.latency.timer('decode'):
+            signatures = protocol.unpack_batch(payload)
+        if len(signatures) != len(query_strings):
+            raise protocol.ProtocolError('Expected {} signatures, got {}.'.format(
+                len(query_strings), len(signatures)))
+        return signatures
+
+    def get_latency_stats(self):
+        """Latency of the connect, send, wait and decode phases.
+
+        :return: dict of phase: {'count', 'p50', 'p99', 'max'}, times in milliseconds
+        """
+        return self.latency.summary()
+
+    async def get_server_latency_stats(self):
+        """Latency summary of the signer server, see signer.Signer.get_latency_stats.
+
+        :return: dict of phase: {'count', 'p50', 'p99', 'max'}, times in milliseconds
+        :raises: ConnectionError, asyncio.TimeoutError, protocol.ProtocolError, protocol.SignerError
+        """
+        return json.loads((await self._call(protocol.OP_STATS, b'')).decode())
+
+    async def close(self):
+        if self._writer:
+            self._drop(self._writer, ConnectionError('Client closed.'))
+
+    async def _call(self, op, payload):
+        attempt = 0
+        while True:
+            future = None
+            try:
+                future = await self._submit(op, payload)
+                with self.latency.timer('wait'):
+                    return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except (OSError, protocol.ProtocolError, asyncio.TimeoutError) as ex:
+                if isinstance(ex, asyncio.TimeoutError) and future is not None and not future.done():
+                    # signer stopped answering, do not reuse this connection
+                    self._drop(future.writer, ConnectionError('Signer did not reply in time.'))
+                    raise
+                # connection dropped, reconnect and resend
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _submit(self, op, payload):
+        writer = await self._ensure_connected()
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        future.writer = writer
+        self._pending[request_id] = future
+        try:
+            with self.latency.timer('send'):
+                writer.write(protocol.pack_frame(op, request_id, payload))
+                await writer.drain()
+        except (OSError, protocol.ProtocolError) as ex:
+            self._drop(writer, ex)
+        return future
+
+    async def _ensure_connected(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is None:
+                with self.latency.timer('connect'):
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                sock = writer.get_extra_info('socket')
+                if sock is not None:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._writer = writer
+                self._reader_task = asyncio.ensure_future(self._read_loop(reader, writer))
+            return self._writer
+
+    async def _read_loop(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(protocol.HEADER.size)
+                except asyncio.IncompleteReadError as ex:
+                    if ex.partial:
+                        raise protocol.ProtocolError('Connection closed in the middle of a frame.')
+                    raise ConnectionError('Connection closed by signer.')
+                op, request_id, length = protocol.HEADER.unpack(header)
+                if length > protocol.MAX_PAYLOAD:
+                    raise protocol.ProtocolError('Payload too large: {} bytes.'.format(length))
+                try:
+                    payload = await reader.readexactly(length) if length else b''
+                except asyncio.IncompleteReadError:
+                    raise protocol.ProtocolError('Connection closed in the middle of a frame.')
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if op == protocol.OP_ERROR:
+                    future.set_exception(protocol.SignerError(payload.decode()))
+                else:
+                    future.set_result(payload)
+        except (OSError, protocol.ProtocolError) as ex:
+            self._drop(writer, ex)
+
+    def _drop(self, writer, ex):
+        if self._writer is not writer:
+            return
+        self._writer = None
+        pending = self._pending
+        self._pending = {}
+        writer.close()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ex)
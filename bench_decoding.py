@@ -0,0 +1,53 @@
+"""Decode time of a 1000 candle klines page: standard json with per-field float conversion,
+as get_price_line does it, against the selected fast backend and the numeric decoder.
+
+    python bench_decoding.py
+"""
+import json
+import random
+import timeit
+import decoding
+from kline_store import klines_to_price_line
+
+PAGE_SIZE = 1000
+ROUNDS = 200
+
+
+def make_page(size=PAGE_SIZE):
+    random.seed(1)
+    rows = []
+    open_time = 1499040000000
+    for _ in range(size):
+        price = random.uniform(5000, 60000)
+        rows.append([open_time, '%.8f' % price, '%.8f' % (price * 1.01), '%.8f' % (price * 0.99),
+                     '%.8f' % price, '%.8f' % random.uniform(1, 500), open_time + 59999,
+                     '%.8f' % random.uniform(1e4, 1e7), random.randint(1, 5000),
+                     '%.8f' % random.uniform(1, 250), '%.8f' % random.uniform(1e4, 5e6), '0'])
+        open_time += 60000
+    return json.dumps(rows, separators=(',', ':')).encode('utf-8')
+
+
+def to_floats(klines):
+    # same conversion as BinanceLite._price_line
+    return [{'time': kline[0], 'open': float(kline[1]), 'high': float(kline[2]), 'low': float(kline[3]),
+             'close': float(kline[4]), 'volume': float(kline[5]), 'action': None}
+            for kline in klines]
+
+
+def bench(name, func):
+    seconds = timeit.timeit(func, number=ROUNDS) / ROUNDS
+    print('{:<40} {:8.3f} ms'.format(name, seconds * 1000))
+    return seconds
+
+
+if __name__ == '__main__':
+    content = make_page()
+    print('{} candles, {} bytes, backends: {}'.format(PAGE_SIZE, len(content), decoding.BACKENDS))
+    baseline = bench('json + float()', lambda: to_floats(json.loads(content.decode('utf-8'))))
+    fast = bench('{} + float()'.format(decoding.get_backend()), lambda: to_floats(decoding.loads(content)))
+    numeric = bench('decode_klines + price line array',
+                    lambda: klines_to_price_line(decoding.decode_klines(content)))
+    print('speedup: {} {:.1f}x, numeric {:.1f}x'.format(decoding.get_backend(), baseline / fast, baseline / numeric))
+    if decoding.get_backend() != 'json':
+        decoding.set_backend('json')
+        bench('decode_klines, json backend', lambda: klines_to_price_line(decoding.decode_klines(content)))
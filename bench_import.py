@@ -0,0 +1,44 @@
+"""Startup guard: time `import binance_lite` in fresh interpreters and check that heavy optional
+dependencies stay unloaded until they are used. Exits with 1 when the budget is exceeded.
+
+    python bench_import.py [budget_ms]
+"""
+import os
+import subprocess
+import sys
+import time
+
+# import time of binance_lite on top of a bare interpreter, in milliseconds
+IMPORT_BUDGET_MS = 250
+RUNS = 7
+
+# imported on first use only
+LAZY_MODULES = ('dateparser', 'pytz', 'numpy', 'asyncio', 'aiohttp', 'websocket', 'Crypto')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(code):
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=HERE)
+    return time.perf_counter() - start, output.decode()
+
+
+def median_time(code):
+    times = sorted(run(code)[0] for _ in range(RUNS))
+    return times[len(times) // 2]
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET_MS
+    bare = median_time('pass')
+    imported = median_time('import binance_lite')
+    import_ms = (imported - bare) * 1000
+    _, loaded = run('import sys, binance_lite; print(" ".join(m for m in {} if m in sys.modules))'.format(
+        LAZY_MODULES))
+    loaded = loaded.split()
+    print('import binance_lite: {:.1f} ms (budget {:.0f} ms)'.format(import_ms, budget))
+    if loaded:
+        print('loaded at import, should be lazy: {}'.format(', '.join(loaded)))
+    if import_ms > budget or loaded:
+        sys.exit(1)
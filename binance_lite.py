@@ -1,14 +1,44 @@
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
 from operator import itemgetter
-from exceptions import BinanceAPIException, BinanceRequestException
-import connection
-import dateparser
-import pytz
-from datetime import datetime
+from exceptions import BinanceAPIException, BinanceRequestException, BinanceOrderException, \
+    BinanceOrderMinTotalException
+import signing
+import decoding
+from log import NullLog
+import re
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import WeightBudget, get_limiter
+from symbol_info import SymbolInfoCache
+from metrics import RequestMetrics
+from prepared_order import PreparedOrder
+
+
+# "now UTC", "11 hours ago UTC", parsed without dateparser
+RELATIVE_DATE_RE = re.compile(r'^\s*(?:now|(\d+)\s+(second|minute|hour|day|week)s?\s+ago)(?:\s+utc)?\s*$',
+                              re.IGNORECASE)
+SECONDS_PER_UNIT = {'second': 1, 'minute': 60, 'hour': 60 * 60, 'day': 24 * 60 * 60, 'week': 7 * 24 * 60 * 60}
+# epoch numbers have 9 digits or more (1973 in seconds), shorter ones, e.g. years, go to dateparser
+EPOCH_RE = re.compile(r'^\d{9,}(\.\d*)?$')
+EPOCH_MIN = 10 ** 8
+ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+# epoch numbers from this value on are taken as milliseconds, below as seconds
+EPOCH_MILLISECONDS_FROM = 10 ** 11
 
 
 class BinanceLite(object):
+    """Binance REST client.
+
+    Concurrency: one instance can be shared by any number of threads. Requests go through one
+    requests session whose connection pool keeps up to pool_size keep-alive connections per host,
+    so size it to the number of threads sending at once. Every call handles its own response, and
+    the response attribute holds the last response of the calling thread. The rate limiter,
+    request metrics, symbol info cache and remote signer are thread-safe and shared by all
+    threads. Do not change class constants, e.g. RECV_WINDOW, while other threads send.
+    """
     API_KEY = 'appKeyHere'
 
     PUBLIC_API_VERSION = 'v1'
@@ -17,6 +47,8 @@ class BinanceLite(object):
 
     RECV_WINDOW = 7000
 
+    KLINES_REQUEST_WEIGHT = 2
+
     SIDE_BUY = 'BUY'
     SIDE_SELL = 'SELL'
 
@@ -30,11 +62,57 @@ class BinanceLite(object):
 
     SYMBOL_BTCUSDT = 'BTCUSDT'
 
-    def __init__(self, log=None):
-        self.log = log
+    def __init__(self, log=None, signer=None, limiter=None, metrics=None, pool_size=20, hedging=None):
+        """
+        :param log: log.Log instance, default: no logging
+        :param signer: signing.SignerBackend used for signed calls, default: signing.RemoteSigner
+        :param limiter: ratelimit.RateLimiter, default: the one shared by the process
+        :param metrics: metrics.RequestMetrics to record requests to, default: a new one
+        :param pool_size: keep-alive connections kept per host, the number of threads sending at once
+        :param hedging: hedging.HedgingPolicy for unsigned GETs, default: none, one attempt per call
+        """
+        self.log = log if log is not None else NullLog()
+        self.signer = signer if signer is not None else signing.RemoteSigner()
+        self.limiter = limiter if limiter is not None else get_limiter()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.hedging = hedging
+        self.symbol_info = SymbolInfoCache(self)
+        # user_stream.AccountCache, set by a running user_stream.UserDataStream
+        self.account_cache = None
+        # clock.ClockSync, set by a running clock sync
+        self.clock = None
         self._requests_params = None
+        self._local = threading.local()
+        self.pool_size = pool_size
         self.session = self._init_session()
 
+    @property
+    def response(self):
+        """Last response received by the calling thread, None before the first one."""
+        return getattr(self._local, 'response', None)
+
+    @response.setter
+    def response(self, response):
+        self._local.response = response
+
+    def get_server_time(self):
+        """Test connectivity to the Rest API and get the current server time.
+
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#check-server-time
+
+        :returns: API response
+
+        .. code-block:: python
+
+            {
+                "serverTime": 1499827319559
+            }
+
+        :raises: BinanceRequestException, BinanceAPIException
+
+        """
+        return self._get('time')
+
     def ping(self):
         """Test connectivity to the Rest API.
         :returns: Empty array
@@ -53,7 +131,7 @@ class BinanceLite(object):
             print(ex)
             return False
 
-    def get_order_book(self, **params):
+    def get_order_book(self, as_array=False, **params):
         """Get the Order Book for the market
 
         https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#order-book
@@ -62,6 +140,9 @@ class BinanceLite(object):
         :type symbol: str
         :param limit:  Default 100; max 1000
         :type limit: int
+        :param as_array: optional - decode bids and asks straight to float64 arrays of shape (n, 2),
+            price and quantity columns, see decoding.decode_depth
+        :type as_array: bool
 
         :returns: API response
 
@@ -85,11 +166,21 @@ class BinanceLite(object):
                 ]
             }
 
+        With as_array, depth figures are vectorized:
+
+        .. code-block:: python
+
+            ok, book = client.get_order_book(symbol='BTCUSDT', limit=1000, as_array=True)
+            bids, asks = book['bids'], book['asks']
+            spread = asks[0, 0] - bids[0, 0]
+            cumulative_bids = bids[:, 1].cumsum()
+            imbalance = (bids[:20, 1].sum() - asks[:20, 1].sum()) / (bids[:20, 1].sum() + asks[:20, 1].sum())
+
         :raises: BinanceRequestException, BinanceAPIException
 
         """
         try:
-            order_book = self._get('depth', data=params)
+            order_book = self._get('depth', data=params, decoder=decoding.decode_depth if as_array else None)
             if order_book:
                 return [True, order_book]
             else:
@@ -120,28 +211,20 @@ class BinanceLite(object):
                 'locked': 0.0
             }}
 
+        Served from account_cache without a request while a user data stream keeps it synced.
+
         :raises: BinanceRequestException, BinanceAPIException
 
         """
+        account_cache = self.account_cache
+        if account_cache is not None and account_cache.synced:
+            return self._assets_balance(account_cache.get_account())
         try:
             res = self.get_account(**params)
         except Exception as ex:
             print('get assets error: {}'.format(ex))
             return [False, ex]
-        if res:
-            if "balances" in res:
-                balances = {}
-                for balance in res['balances']:
-                    if balance['asset'] == 'BTC':
-                        balances['BTC'] = {}
-                        balances['BTC']['free'] = float(balance['free'])
-                        balances['BTC']['locked'] = float(balance['locked'])
-                    elif balance['asset'] == 'USDT':
-                        balances['USDT'] = {}
-                        balances['USDT']['free'] = float(balance['free'])
-                        balances['USDT']['locked'] = float(balance['locked'])
-                return [True, balances]
-        return [False, None]
+        return self._assets_balance(res)
 
     def get_open_orders(self, **params):
         """Get all open orders on a symbol.
@@ -173,153 +256,155 @@ class BinanceLite(object):
                 }
             ]
 
+        Served from account_cache without a request while a user data stream keeps it synced.
+
         :raises: BinanceRequestException, BinanceAPIException
 
         """
-        params['recvWindow'] = self.RECV_WINDOW
+        account_cache = self.account_cache
+        if account_cache is not None and account_cache.synced:
+            return account_cache.get_open_orders(params.get('symbol'))
+        params['recvWindow'] = self._recv_window()
         return self._get('openOrders',True,data=params)
 
     def limit_buy(self, usd_amount, price):
-        btc_amount = round(usd_amount / price, 6)
         try:
+            order = self.get_symbol_info(BinanceLite.SYMBOL_BTCUSDT).check_limit_order(usd_amount / price, price)
             try_result = self.create_order(symbol=BinanceLite.SYMBOL_BTCUSDT,
                                            type=BinanceLite.ORDER_TYPE_LIMIT_MAKER,
                                            side=BinanceLite.SIDE_BUY,
-                                           quantity=btc_amount,
-                                           price=price)
+                                           **order)
             result = {'result': True,'info': try_result}
-        except BinanceAPIException as ex:
-            if ex.code == -1013:
-                if ex.message == 'Filter failure: MIN_NOTIONAL':
-                    print('min notional error!')
-                    result = {'result': False,'info': False}
-                else:
-                    result = {'result': False,'info': ex.message}
-            elif ex.code == -2010:
-                if ex.message == 'Account has insufficient balance for requested action.':
-                    print('insufficient assets')
-                    result = {'result': False,'info': False}
-                else:
-                    result = {'result': False,'info': ex.message}
-            else:
-                result = {'result': False,'info': 'error code: {} msg: {}'.format(ex.code,ex.message)}
+        except (BinanceAPIException, BinanceOrderException) as ex:
+            result = self._order_error_result(ex)
         except Exception as ex:
             result = {'result': False,'info': str(ex)}
         return result
 
     def limit_sell(self, btc_amount, price):
-        btc_amount = round(btc_amount, 6)
         try:
+            order = self.get_symbol_info(BinanceLite.SYMBOL_BTCUSDT).check_limit_order(btc_amount, price)
             try_result = self.create_order(symbol=BinanceLite.SYMBOL_BTCUSDT,
                                      type=BinanceLite.ORDER_TYPE_LIMIT_MAKER,
                                      side=BinanceLite.SIDE_SELL,
-                                     quantity=btc_amount,
-                                     price=price)
+                                     **order)
             result = {'result': True, 'info': try_result}
-        except BinanceAPIException as ex:
-            if ex.code == -1013:
-                if ex.message == 'Filter failure: MIN_NOTIONAL':
-                    print('min notional error!')
-                    result = {'result': False, 'info': False}
-                else:
-                    result = {'result': False, 'info': ex.message}
-            elif ex.code == -2010:
-                if ex.message == 'Account has insufficient balance for requested action.':
-                    print('insufficient assets')
-                    result = {'result': False, 'info': False}
-                else:
-                    result = {'result': False, 'info': ex.message}
-            else:
-                result = {'result': False, 'info': 'error code: {} msg: {}'.format(ex.code, ex.message)}
+        except (BinanceAPIException, BinanceOrderException) as ex:
+            result = self._order_error_result(ex)
         except Exception as ex:
             result = {'result': False, 'info': str(ex)}
         return result
 
     def market_buy(self, usd_amount):
-        usd_amount = round(usd_amount, 2)
         try:
+            order = self.get_symbol_info(BinanceLite.SYMBOL_BTCUSDT).check_market_order(quote_quantity=usd_amount)
             info = self.create_order(symbol=BinanceLite.SYMBOL_BTCUSDT,
                                           type=BinanceLite.ORDER_TYPE_MARKET,
                                           side=BinanceLite.SIDE_BUY,
-                                            quoteOrderQty=usd_amount)
+                                            **order)
             if info:
                 return {'result': True,'info': info}
             else:
                 return {'result': False, 'info': 'Signing error.'}
+        except BinanceOrderException as ex:
+            return self._order_error_result(ex)
         except Exception as ex:
             return {'result': False, 'info': str(ex)}
 
     def market_sell(self, btc_amount):
         try:
-            btc_amount = round(btc_amount, 6)
+            order = self.get_symbol_info(BinanceLite.SYMBOL_BTCUSDT).check_market_order(quantity=btc_amount)
             info = self.create_order(symbol=BinanceLite.SYMBOL_BTCUSDT,
                                           type=BinanceLite.ORDER_TYPE_MARKET,
                                           side=BinanceLite.SIDE_SELL,
-                                            quantity=btc_amount)
+                                            **order)
             if info:
                 return {'result': True,'info': info}
             else:
                 return {'result': False, 'info': 'Signing error.'}
+        except BinanceOrderException as ex:
+            return self._order_error_result(ex)
         except Exception as ex:
             return {'result': False, 'info': str(ex)}
 
     def market_test_buy(self, usd_amount):
         try:
-            usd_amount = round(usd_amount, 2)
+            order = self.get_symbol_info(BinanceLite.SYMBOL_BTCUSDT).check_market_order(quote_quantity=usd_amount)
             info = self.create_test_order(symbol=BinanceLite.SYMBOL_BTCUSDT,
                                           type=BinanceLite.ORDER_TYPE_MARKET,
                                           side=BinanceLite.SIDE_BUY,
-                                            quoteOrderQty=usd_amount)
+                                            **order)
             result = {'result': True,'info': info}
-        except BinanceAPIException as ex:
-            if ex.code == -1013:
-                if ex.message == 'Filter failure: MIN_NOTIONAL':
-                    print('min notional error!')
-                    result = {'result': False,'info': False}
-                else:
-                    result = {'result': False,'info': ex.message}
-            elif ex.code == -2010:
-                if ex.message == 'Account has insufficient balance for requested action.':
-                    print('insufficient assets')
-                    result = {'result': False,'info': False}
-                else:
-                    result = {'result': False,'info': ex.message}
-            else:
-                result = {'result': False,'info': 'error code: {} msg: {}'.format(ex.code,ex.message)}
+        except (BinanceAPIException, BinanceOrderException) as ex:
+            result = self._order_error_result(ex)
         except Exception as ex:
             result = {'result': False,'info': str(ex)}
         return result
 
     def market_test_sell(self, btc_amount):
         try:
-            btc_amount = round(btc_amount, 6)
+            order = self.get_symbol_info(BinanceLite.SYMBOL_BTCUSDT).check_market_order(quantity=btc_amount)
             info = self.create_test_order(symbol=BinanceLite.SYMBOL_BTCUSDT,
                                               type=BinanceLite.ORDER_TYPE_MARKET,
                                               side=BinanceLite.SIDE_SELL,
-                                                quantity=btc_amount)
+                                                **order)
             if info:
                 result = {'result': True,'info': info}
             else:
                 result = {'result': False, 'info': 'Signing error.'}
-        except BinanceAPIException as ex:
-            if ex.code == -1013:
-                if ex.message == 'Filter failure: MIN_NOTIONAL':
-                    print('min notional error!')
-                    result = {'result': False,'info': False}
-                else:
-                    result = {'result': False,'info': ex.message}
-            elif ex.code == -2010:
-                if ex.message == 'Account has insufficient balance for requested action.':
-                    print('insufficient assets')
-                    result = {'result': False,'info': False}
-                else:
-                    result = {'result': False,'info': ex.message}
-            else:
-                result = {'result': False,'info': 'error code: {} msg: {}'.format(ex.code,ex.message)}
+        except (BinanceAPIException, BinanceOrderException) as ex:
+            result = self._order_error_result(ex)
         except Exception as ex:
             result = {'result': False,'info': str(ex)}
         return result
 
+    def get_exchange_info(self):
+        """Current exchange trading rules and symbol information.
+
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#exchange-information
+
+        :returns: API response
+
+        .. code-block:: python
+
+            {
+                "timezone": "UTC",
+                "serverTime": 1508631584636,
+                "rateLimits": [...],
+                "symbols": [
+                    {
+                        "symbol": "BTCUSDT",
+                        "status": "TRADING",
+                        "baseAsset": "BTC",
+                        "quoteAsset": "USDT",
+                        "quoteAssetPrecision": 8,
+                        "filters": [
+                            {"filterType": "PRICE_FILTER", "minPrice": "0.01000000", "maxPrice": "1000000.00000000", "tickSize": "0.01000000"},
+                            {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000", "stepSize": "0.00001000"},
+                            {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": true, ...}
+                        ]
+                    }
+                ]
+            }
+
+        :raises: BinanceRequestException, BinanceAPIException
+
+        """
+        return self._get('exchangeInfo', version=self.PRIVATE_API_VERSION)
+
+    def get_symbol_info(self, symbol):
+        """Trading rules of a symbol, from the cached exchangeInfo.
+
+        :param symbol: required e.g BNBBTC
+        :type symbol: str
+
+        :returns: symbol_info.SymbolInfo
+
+        :raises: BinanceOrderUnknownSymbolException, BinanceRequestException, BinanceAPIException
+
+        """
+        return self.symbol_info.get(symbol)
+
     def create_order(self, **params):
         """"
         Any order with an icebergQty MUST have timeInForce set to GTC.
@@ -431,10 +516,100 @@ class BinanceLite(object):
         :raises: BinanceRequestException, BinanceAPIException, BinanceOrderException, BinanceOrderMinAmountException, BinanceOrderMinPriceException, BinanceOrderMinTotalException, BinanceOrderUnknownSymbolException, BinanceOrderInactiveSymbolException
 
         """
-        params['recvWindow'] = self.RECV_WINDOW
+        params['recvWindow'] = self._recv_window()
         params['newOrderRespType'] = 'FULL'
         return self._post('order', True, data=params)
 
+    def create_orders(self, orders):
+        """Create several orders. All of them are signed in a single round trip to the signer.
+
+        :param orders: list of create_order params dicts
+        :type orders: list
+
+        :returns: list of [True, API response] or [False, error], in the order of orders
+
+        .. code-block:: python
+
+            [
+                [True, {"symbol": "BTCUSDT", "orderId": 28, ...}],
+                [False, BinanceAPIException(...)]
+            ]
+
+        """
+        data_list = []
+        for params in orders:
+            params = dict(params)
+            params['recvWindow'] = self.RECV_WINDOW
+            params['newOrderRespType'] = 'FULL'
+            data_list.append(params)
+        return self._request_batch('post', 'order', data_list)
+
+    def place_ladder(self, legs, symbol=SYMBOL_BTCUSDT, order_type=ORDER_TYPE_LIMIT_MAKER, workers=10):
+        """Place a ladder of limit orders at once. Every leg is checked with the symbol filters,
+        all of them are signed in one round trip to the signer and posted concurrently, within
+        the rate limiter, so the ladder takes about the time of a single order.
+
+        :param legs: list of (side, quantity, price) tuples, quantity in base asset
+        :type legs: list
+        :param symbol: Default BTCUSDT
+        :type symbol: str
+        :param order_type: LIMIT_MAKER by default, or LIMIT
+        :type order_type: str
+        :param workers: max orders in flight
+        :type workers: int
+
+        :returns: list of {'result', 'info'} dicts as returned by limit_buy, in the order of legs
+
+        .. code-block:: python
+
+            client.place_ladder([(BinanceLite.SIDE_BUY, 0.001, 30000), (BinanceLite.SIDE_BUY, 0.001, 29900)])
+
+        """
+        results = [None] * len(legs)
+        indexes = []
+        data_list = []
+        for i, (side, quantity, price) in enumerate(legs):
+            try:
+                order = self.get_symbol_info(symbol).check_limit_order(quantity, price)
+            except (BinanceAPIException, BinanceOrderException) as ex:
+                results[i] = self._order_error_result(ex)
+                continue
+            except Exception as ex:
+                results[i] = {'result': False, 'info': str(ex)}
+                continue
+            params = {'symbol': symbol, 'side': side, 'type': order_type, 'recvWindow': self.RECV_WINDOW,
+                      'newOrderRespType': 'FULL'}
+            if order_type == self.ORDER_TYPE_LIMIT:
+                params['timeInForce'] = 'GTC'
+            params.update(order)
+            indexes.append(i)
+            data_list.append(params)
+        if data_list:
+            responses = self._request_batch('post', 'order', data_list, workers=workers)
+            for i, (ok, info) in zip(indexes, responses):
+                if ok:
+                    results[i] = {'result': True, 'info': info}
+                elif isinstance(info, (BinanceAPIException, BinanceOrderException)):
+                    results[i] = self._order_error_result(info)
+                else:
+                    results[i] = {'result': False, 'info': str(info)}
+        return results
+
+    def prepare_order(self, test=False, check=True, **params):
+        """Prepare an order of a fixed shape to be submitted many times with different price and
+        quantity, see prepared_order.PreparedOrder. For LIMIT and LIMIT_MAKER orders.
+
+        :param test: submit to the test endpoint, orders are validated but not placed
+        :type test: bool
+        :param check: quantize and check price and quantity with the symbol filters on submit
+        :type check: bool
+        :param params: static create_order params, symbol required, side, type, timeInForce...
+
+        :returns: prepared_order.PreparedOrder
+
+        """
+        return PreparedOrder(self, test=test, check=check, **params)
+
     def create_test_order(self, **params):
         """Test new order creation and signature/recvWindow long. Creates and validates a new order but does not send it into the matching engine.
 
@@ -472,7 +647,7 @@ class BinanceLite(object):
 
         """
         params['newOrderRespType'] = 'FULL'
-        params['recvWindow'] = self.RECV_WINDOW
+        params['recvWindow'] = self._recv_window()
         return self._post('order/test',True,data=params)
 
     def get_account(self, **params):
@@ -512,7 +687,7 @@ class BinanceLite(object):
         :raises: BinanceRequestException, BinanceAPIException
 
         """
-        params['recvWindow'] = self.RECV_WINDOW
+        params['recvWindow'] = self._recv_window()
         return self._get('account', True, data=params)
 
     def cancel_order(self, **params):
@@ -545,33 +720,115 @@ class BinanceLite(object):
         :raises: BinanceRequestException, BinanceAPIException
 
         """
-        params['recvWindow'] = self.RECV_WINDOW
+        params['recvWindow'] = self._recv_window()
         return self._delete('order',True,data=params)
 
+    def cancel_orders(self, orders):
+        """Cancel several orders. All of them are signed in a single round trip to the signer.
+
+        :param orders: list of cancel_order params dicts
+        :type orders: list
+
+        :returns: list of [True, API response] or [False, error], in the order of orders
+
+        """
+        data_list = []
+        for params in orders:
+            params = dict(params)
+            params['recvWindow'] = self.RECV_WINDOW
+            data_list.append(params)
+        return self._request_batch('delete', 'order', data_list)
+
     def cancel_all_open_orders(self, **params):
         # symbol required
-        params['recvWindow'] = self.RECV_WINDOW
+        params['recvWindow'] = self._recv_window()
         return self._delete('openOrders', True, data=params)
 
-    def get_price_line(self, start_str_or_float, interval, end_str_or_float=None):
+    def get_request_metrics(self):
+        """Get counts, latencies and payload sizes of the requests sent so far, per endpoint.
+        See metrics.RequestMetrics.snapshot for the format, use self.metrics.export to write it.
+
+        :return: dict of 'METHOD path': metrics
+        """
+        return self.metrics.snapshot()
+
+    def stream_get_listen_key(self):
+        """Start a new user data stream. Only the API key is needed, the request is not signed.
+
+        https://github.com/binance-exchange/binance-official-api-docs/blob/master/user-data-stream.md#create-a-listenkey
+
+        :returns: API response
+
+        .. code-block:: python
+
+            {
+                "listenKey": "pqia91ma19a5s61cv6a81va65sdf19v8a65a1a5s61cv6a81va65sdf19v8a65a1"
+            }
+
+        :raises: BinanceRequestException, BinanceAPIException
+
+        """
+        return self._post('userDataStream', version=self.PRIVATE_API_VERSION)
+
+    def stream_keepalive(self, listen_key):
+        """Keep a user data stream alive for another 60 minutes, send it every 30 minutes.
+
+        :param listen_key: required
+        :type listen_key: str
+
+        :returns: API response, {}
+
+        :raises: BinanceRequestException, BinanceAPIException
+
+        """
+        return self._put('userDataStream', version=self.PRIVATE_API_VERSION, data={'listenKey': listen_key})
+
+    def stream_close(self, listen_key):
+        """Close a user data stream.
+
+        :param listen_key: required
+        :type listen_key: str
+
+        :returns: API response, {}
+
+        :raises: BinanceRequestException, BinanceAPIException
+
+        """
+        return self._delete('userDataStream', version=self.PRIVATE_API_VERSION, data={'listenKey': listen_key})
+
+    def get_price_line(self, start_str_or_float, interval, end_str_or_float=None, store=None, as_array=False):
+        """Get OHLCV line of BTCUSDT.
+
+        :param store: optional - kline_store.KlineStore to serve the klines from, see get_cached_klines
+        :param as_array: optional - return a numpy structured array of kline_store.PRICE_LINE_DTYPE
+            (int64 time, float64 open, high, low, close and volume) instead of a list of dicts
+
+        :return: (error, list of dicts with time, open, high, low, close, volume and action keys,
+            or structured array if as_array)
+
+        """
         try:
+            if store is not None:
+                columns = self.get_cached_klines(store, start_str_or_float=start_str_or_float,
+                                                 end_str_or_float=end_str_or_float, interval=interval)
+                if as_array:
+                    from kline_store import columns_to_price_line
+                    return False, columns_to_price_line(columns)
+                return False, self._columns_price_line(columns)
+            if as_array:
+                # convert page by page, raw pages are not kept
+                import numpy as np
+                from kline_store import klines_to_price_line, PRICE_LINE_DTYPE
+                pages = [klines_to_price_line(page) for page in
+                         self.iter_historical_klines(start_str_or_float=start_str_or_float,
+                                                     end_str_or_float=end_str_or_float, interval=interval,
+                                                     numeric=True)]
+                return False, np.concatenate(pages) if pages else np.empty(0, dtype=PRICE_LINE_DTYPE)
             candles_1m = self.get_historical_klines(start_str_or_float=start_str_or_float,
                                                  end_str_or_float=end_str_or_float, interval=interval)
         except Exception as ex:
             return str(ex), False
-        total_data = []
-        for i in range(len(candles_1m)):
-            open = float(candles_1m[i][1])
-            close = float(candles_1m[i][4])
-            single_input = {'time': candles_1m[i][0],
-                            'open': open,
-                            'high': float(candles_1m[i][2]),
-                            'low': float(candles_1m[i][3]),
-                            'close': close,
-                            'volume': float(candles_1m[i][5]),
-                            'action': None}
-            total_data.append(single_input)
-        return False, total_data
+        return False, self._price_line(candles_1m)
 
     def get_symbol_ticker(self, **params):
         """Latest price for a symbol or symbols.
@@ -636,20 +893,36 @@ class BinanceLite(object):
         :return: list of OHLCV values
 
         """
-        # init our list
         output_data = []
+        for page in self.iter_historical_klines(interval, start_str_or_float, end_str_or_float, symbol, limit):
+            output_data += page
+        return output_data
 
-        # setup the max limit
-        limit = limit
+    def iter_historical_klines(self, interval, start_str_or_float, end_str_or_float=None, symbol=SYMBOL_BTCUSDT,
+                               limit=1000, per_candle=False, numeric=False):
+        """Lazy version of get_historical_klines, yields every page as soon as it is downloaded.
+        The next page is requested only when the consumer asks for it.
 
-        # convert interval to useful value in seconds
-        timeframe = self._interval_to_milliseconds(interval)
+        :param symbol: Name of symbol pair e.g BNBBTC
+        :type symbol: str
+        :param interval: Binance Kline interval
+        :type interval: str
+        :param start_str_or_float: Start date string in UTC format or timestamp in seconds
+        :type start_str_or_float: str|float
+        :param end_str_or_float: optional - end date string in UTC format or timestamp in seconds (default will fetch everything up to now)
+        :type end_str_or_float: str|float
+        :param limit: Default 1000; max 1000.
+        :type limit: int
+        :param per_candle: yield single klines instead of pages
+        :type per_candle: bool
+        :param numeric: decode pages straight to float64 arrays of shape (n, 12), see decoding.decode_klines
+        :type numeric: bool
+
+        :return: generator of lists of OHLCV values, or of OHLCV values if per_candle
 
+        """
         # convert our date strings to milliseconds
-        if isinstance(start_str_or_float, float):
-            start_ts = int(start_str_or_float * 1000)
-        else:
-            start_ts = self._date_to_milliseconds(start_str_or_float)
+        start_ts = self._str_or_float_to_milliseconds(start_str_or_float)
 
         # establish first available start timestamp
         first_valid_ts = self._get_earliest_valid_timestamp(symbol, interval)
@@ -658,47 +931,124 @@ class BinanceLite(object):
         # if an end time was passed convert it
         end_ts = None
         if end_str_or_float:
-            if isinstance(end_str_or_float, float):
-                end_ts = int(end_str_or_float * 1000)
+            end_ts = self._str_or_float_to_milliseconds(end_str_or_float)
+
+        decoder = decoding.decode_klines if numeric else None
+        for page in self._iter_klines_range(symbol, interval, start_ts, end_ts, limit, decoder):
+            if per_candle:
+                for kline in page:
+                    yield kline
             else:
-                end_ts = self._date_to_milliseconds(end_str_or_float)
+                yield page
 
-        idx = 0
-        while True:
-            # fetch the klines from start_ts up to max 500 entries or the end_ts if set
-            temp_data = self._get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit,
-                startTime=start_ts,
-                endTime=end_ts
-            )
+    def get_cached_klines(self, store, interval, start_str_or_float, end_str_or_float=None,
+                          symbol=SYMBOL_BTCUSDT, limit=1000):
+        """Get Historical Klines, served from a local kline_store.KlineStore. Only the ranges the
+        store does not cover yet are downloaded and then stored.
 
-            # handle the case where exactly the limit amount of data was returned last loop
-            if not len(temp_data):
-                break
+        :param store: kline_store.KlineStore
+        :param symbol: Name of symbol pair e.g BNBBTC
+        :type symbol: str
+        :param interval: Binance Kline interval
+        :type interval: str
+        :param start_str_or_float: Start date string in UTC format or timestamp in seconds
+        :type start_str_or_float: str|float
+        :param end_str_or_float: optional - end date string in UTC format or timestamp in seconds (default will fetch everything up to now)
+        :type end_str_or_float: str|float
+        :param limit: Default 1000; max 1000.
+        :type limit: int
 
-            # append this loops data to our output data
-            output_data += temp_data
+        :return: dict of column name: numpy array, see kline_store.KLINE_COLUMNS
 
-            # set our start timestamp using the last value in the array
-            start_ts = temp_data[-1][0]
+        """
+        timeframe = self._interval_to_milliseconds(interval)
+        start_ts = self._str_or_float_to_milliseconds(start_str_or_float)
+        now_ts = int(time.time() * 1000)
+        end_ts = now_ts
+        if end_str_or_float:
+            end_ts = min(self._str_or_float_to_milliseconds(end_str_or_float), now_ts)
+        # klines opened in the last interval may still change, never store them
+        closed_end_ts = min(end_ts, now_ts - timeframe)
+        if start_ts <= closed_end_ts:
+            for gap_start, gap_end in store.missing(symbol, interval, start_ts, closed_end_ts):
+                klines = self._get_klines_range(symbol, interval, gap_start, gap_end, limit)
+                store.update(symbol, interval, klines, gap_start, gap_end)
+            columns = store.get(symbol, interval, start_ts, closed_end_ts)
+        else:
+            # only the open kline is asked for
+            from kline_store import klines_to_columns
+            columns = klines_to_columns([])
+        if end_ts > closed_end_ts:
+            recent = self._get_klines_range(symbol, interval, max(start_ts, closed_end_ts + 1), end_ts, limit)
+            if recent:
+                columns = store.concat(columns, recent)
+        return columns
+
+    def get_historical_klines_parallel(self, interval, start_str_or_float, end_str_or_float=None,
+                                       symbol=SYMBOL_BTCUSDT, limit=1000, workers=8,
+                                       max_weight_per_minute=600):
+        """Get Historical Klines from Binance, fetching pages concurrently.
+
+        The range is split into page-aligned chunks of limit klines, which are downloaded by
+        a pool of workers while the request weight stays within max_weight_per_minute.
+        Returns the same data as get_historical_klines.
 
-            idx += 1
-            # check if we received less than the required limit and exit the loop
-            if len(temp_data) < limit:
-                # exit the while loop
-                break
+        :param symbol: Name of symbol pair e.g BNBBTC
+        :type symbol: str
+        :param interval: Binance Kline interval
+        :type interval: str
+        :param start_str_or_float: Start date string in UTC format or timestamp in seconds
+        :type start_str_or_float: str|float
+        :param end_str_or_float: optional - end date string in UTC format or timestamp in seconds (default will fetch everything up to now)
+        :type end_str_or_float: str|float
+        :param limit: Default 1000; max 1000.
+        :type limit: int
+        :param workers: number of concurrent requests
+        :type workers: int
+        :param max_weight_per_minute: request weight budget of the download
+        :type max_weight_per_minute: int
 
-            # increment next call by our timeframe
-            start_ts += timeframe
-            # sleep to be kind to the API
-            if idx % 17 == 0:
-                time.sleep(0.3)
+        :return: list of OHLCV values
+
+        """
+        timeframe = self._interval_to_milliseconds(interval)
+        start_ts = self._str_or_float_to_milliseconds(start_str_or_float)
+        first_valid_ts = self._get_earliest_valid_timestamp(symbol, interval)
+        start_ts = max(start_ts, first_valid_ts)
+        if end_str_or_float:
+            end_ts = self._str_or_float_to_milliseconds(end_str_or_float)
+        else:
+            end_ts = int(time.time() * 1000)
+        if start_ts > end_ts:
+            return []
 
+        # every chunk spans exactly limit intervals, so it fits in a single page
+        span = limit * timeframe
+        chunks = [(chunk_start, min(chunk_start + span - 1, end_ts))
+                  for chunk_start in range(start_ts, end_ts + 1, span)]
+
+        budget = WeightBudget(max_weight_per_minute)
+
+        def fetch(chunk):
+            budget.acquire(self.KLINES_REQUEST_WEIGHT)
+            return self._get_klines(symbol=symbol,
+                                    interval=interval,
+                                    limit=limit,
+                                    startTime=chunk[0],
+                                    endTime=chunk[1])
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(fetch, chunks))
+
+        # merge in order, without duplicates
+        output_data = []
+        for page in pages:
+            for kline in page:
+                if not output_data or kline[0] > output_data[-1][0]:
+                    output_data.append(kline)
         return output_data
 
-    def _get_klines(self,**params):
+    def _get_klines(self, decoder=None, **params):
         """Kline/candlestick bars for a symbol. Klines are uniquely identified by their open time.
 
         https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#klinecandlestick-data
@@ -738,7 +1088,47 @@ class BinanceLite(object):
         :raises: BinanceRequestException, BinanceAPIException
 
         """
-        return self._get('klines', data=params)
+        return self._get('klines', data=params, decoder=decoder)
+
+    def _get_klines_range(self, symbol, interval, start_ts, end_ts, limit=1000):
+        """Get klines with open time from start_ts to end_ts (None for now)."""
+        output_data = []
+        for page in self._iter_klines_range(symbol, interval, start_ts, end_ts, limit):
+            output_data += page
+        return output_data
+
+    def _iter_klines_range(self, symbol, interval, start_ts, end_ts, limit=1000, decoder=None):
+        """Page through klines with open time from start_ts to end_ts (None for now)."""
+        # convert interval to useful value in seconds
+        timeframe = self._interval_to_milliseconds(interval)
+
+        while True:
+            # fetch the klines from start_ts up to max 500 entries or the end_ts if set
+            temp_data = self._get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                startTime=start_ts,
+                endTime=end_ts,
+                decoder=decoder
+            )
+
+            # handle the case where exactly the limit amount of data was returned last loop
+            if not len(temp_data):
+                break
+
+            yield temp_data
+
+            # set our start timestamp using the last value in the array
+            start_ts = int(temp_data[-1][0])
+
+            # check if we received less than the required limit and exit the loop
+            if len(temp_data) < limit:
+                # exit the while loop
+                break
+
+            # increment next call by our timeframe
+            start_ts += timeframe
 
     def _get_earliest_valid_timestamp(self, symbol, interval):
         """Get earliest valid open timestamp from Binance
@@ -762,6 +1152,10 @@ class BinanceLite(object):
 
     def _init_session(self):
         session = requests.session()
+        # block instead of opening throwaway connections when more threads send than pool_size
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         session.headers.update({'Accept': 'application/json',
                                 'User-Agent': 'binance/python',
                                 'X-MBX-APIKEY': self.API_KEY})
@@ -773,21 +1167,48 @@ class BinanceLite(object):
     def _get(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         return self._request_api('get', path, signed, version, **kwargs)
 
+    def _put(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
+        return self._request_api('put', path, signed, version, **kwargs)
+
     def _delete(self, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         return self._request_api('delete', path, signed, version, **kwargs)
 
     def _request_api(self, method, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         uri = self._create_api_uri(path, signed, version)
 
+        if method == 'get' and not signed and self.hedging is not None:
+            # idempotent read, attempts may run in parallel, each gets its own copy of the params
+            data = kwargs.get('data')
+
+            def send(limit):
+                attempt_kwargs = dict(kwargs)
+                if data is not None:
+                    attempt_kwargs['data'] = dict(data)
+                attempt_kwargs.setdefault('timeout', self.hedging.timeout)
+                # attempts run on pool threads, hand their response over to the calling thread
+                self.response = None
+                try:
+                    return self._request(method, uri, signed, limit=limit, **attempt_kwargs), self.response
+                except Exception as ex:
+                    ex.attempt_response = self.response
+                    raise
+
+            try:
+                result, self.response = self.hedging.call(self, path, data, send)
+            except Exception as ex:
+                self.response = getattr(ex, 'attempt_response', None)
+                raise
+            return result
+
         return self._request(method, uri, signed, **kwargs)
 
     def _create_api_uri(self, path, signed=True, version=PUBLIC_API_VERSION):
         v = self.PRIVATE_API_VERSION if signed else version
         return self.API_URL + '/' + v + '/' + path
 
-    def _request(self, method, uri, signed, force_params=False, **kwargs):
+    def _request(self, method, uri, signed, force_params=False, decoder=None, limit=True, **kwargs):
         # set default requests timeout
-        kwargs['timeout'] = 10
+        kwargs.setdefault('timeout', 10)
 
         # add our global requests params
         if self._requests_params:
@@ -803,10 +1224,18 @@ class BinanceLite(object):
                 kwargs.update(kwargs['data']['requests_params'])
                 del(kwargs['data']['requests_params'])
 
-        if signed:
-            # generate signature
-            kwargs['data']['timestamp'] = int(time.time() * 1000)
+        path = self._endpoint_path(uri)
+        # wait for the weight before signing, so the timestamp is fresh, unless the caller took it
+        if limit:
+            self.limiter.acquire(method, path, data)
+
+        timings = {}
+        start = time.perf_counter()
+        if signed and 'signature' not in kwargs['data']:
+            # generate signature, unless it was signed beforehand in a batch
+            kwargs['data']['timestamp'] = self._timestamp()
             signature = self._call_for_signature(kwargs['data'])
+            timings['sign'] = time.perf_counter() - start
             if not signature:
                 print('Signature error!')
                 return None
@@ -826,36 +1255,225 @@ class BinanceLite(object):
             kwargs['params'] = '&'.join('%s=%s' % (data[0], data[1]) for data in kwargs['data'])
             del(kwargs['data'])
 
-        self.response = getattr(self.session, method)(uri, **kwargs)
-        return self._handle_response()
+        return self._send(method, uri, path, timings, start, decoder, **kwargs)
+
+    def _send(self, method, uri, path, timings, start, decoder=None, **kwargs):
+        """Send a prepared request, update the limiter and record metrics.
+
+        :param timings: phases timed so far, e.g. sign
+        :param start: perf_counter at the start of the request
+        """
+        # keep the response local, the client may be used from several threads
+        network_start = time.perf_counter()
+        try:
+            response = getattr(self.session, method)(uri, **kwargs)
+        except Exception:
+            timings['network'] = time.perf_counter() - network_start
+            self.metrics.record(method, path, 'error', timings)
+            raise
+        decode_start = time.perf_counter()
+        timings['network'] = decode_start - network_start
+        self.response = response
+        self.limiter.update(response)
+        try:
+            return self._handle_response(response, decoder)
+        except BinanceAPIException as ex:
+            if ex.code == -1021 and self.clock is not None:
+                # timestamp outside recvWindow, the clock estimate is off
+                self.clock.resync()
+            raise
+        finally:
+            done = time.perf_counter()
+            timings['decode'] = done - decode_start
+            timings['total'] = done - start
+            request_body = response.request.body if response.request is not None else None
+            self.metrics.record(method, path, response.status_code, timings,
+                                len(request_body or kwargs.get('params') or ''), len(response.content))
+
+    def _timestamp(self):
+        # server time estimate of a running clock sync, local time otherwise
+        clock = self.clock
+        if clock is not None and clock.synced:
+            return clock.timestamp()
+        return int(time.time() * 1000)
+
+    def _recv_window(self):
+        # single requests only, batches share one timestamp and keep RECV_WINDOW
+        clock = self.clock
+        if clock is not None and clock.synced:
+            return clock.recv_window()
+        return self.RECV_WINDOW
+
+    def _endpoint_path(self, uri):
+        # path after the api version, the key of ratelimit.ENDPOINT_WEIGHTS
+        return uri[len(self.API_URL) + 1:].split('/', 1)[-1]
+
+    def _request_batch(self, method, path, data_list, workers=1):
+        """Sign requests in one round trip to the signer, then send them one by one, or
+        concurrently from workers threads.
+
+        Requests go in chunks that fit the rate limiter budgets. The weight of a whole chunk is
+        taken before it is stamped and signed, so no timestamp ages while waiting for the limiter.
+
+        :returns: list of [True, API response] or [False, error], in the order of data_list
+        """
+        uri = self._create_api_uri(path, True, self.PRIVATE_API_VERSION)
+        chunk_size = self.limiter.batch_size(method, path)
+        results = []
+        for i in range(0, len(data_list), chunk_size):
+            results += self._request_chunk(method, uri, path, data_list[i:i + chunk_size], workers)
+        return results
+
+    def _request_chunk(self, method, uri, path, data_list, workers):
+        data_list = [dict(data) for data in data_list]
+        for data in data_list:
+            self.limiter.acquire(method, path, data)
+        timestamp = self._timestamp()
+        for data in data_list:
+            data['timestamp'] = timestamp
+        signatures = self._call_for_signatures(data_list)
+        if not signatures:
+            print('Signature error!')
+            return [[False, 'Signature error!'] for _ in data_list]
+        for data, signature in zip(data_list, signatures):
+            data['signature'] = signature
+
+        def send(data):
+            try:
+                # weight was taken for the whole chunk
+                return [True, self._request(method, uri, True, limit=False, data=data)]
+            except Exception as ex:
+                return [False, ex]
+
+        if workers > 1 and len(data_list) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(data_list))) as executor:
+                return list(executor.map(send, data_list))
+        return [send(data) for data in data_list]
 
     def _call_for_signature(self, data):
-        ordered_data = self._order_params(data)
-        query_string = '&'.join(["{}={}".format(d[0], d[1]) for d in ordered_data])
+        return self._sign_query_string(self._query_string(data))
+
+    def _sign_query_string(self, query_string):
         # log that
         self.log.append_specific(query_string)
-        signature = connection.get_signature(query_string)
+        try:
+            signature = self.signer.sign(query_string)
+        except Exception as ex:
+            signature = None
+            error = str(ex)
+        else:
+            error = 'SIGNING ERROR.'
         # validate and log that too
-        if signature[0]: # result positive
-            signature = signature[0]
+        if signature: # result positive
             self.log.append_specific('signature obtained.')
         else:   # error
-            error = signature[1]
-            self.log.append_general(error)
+            self.log.append_general(error, is_error=True)
             signature = False
         return signature
 
-    def _handle_response(self):
+    def _call_for_signatures(self, data_list):
+        query_strings = [self._query_string(data) for data in data_list]
+        for query_string in query_strings:
+            self.log.append_specific(query_string)
+        try:
+            signatures = self.signer.sign_batch(query_strings)
+        except Exception as ex:
+            signatures = None
+            error = str(ex)
+        else:
+            error = 'SIGNING ERROR.'
+        if signatures and all(signatures):
+            self.log.append_specific('{} signatures obtained.'.format(len(signatures)))
+        else:
+            self.log.append_general(error, is_error=True)
+            signatures = False
+        return signatures
+
+    @classmethod
+    def _query_string(cls, data):
+        return '&'.join(["{}={}".format(d[0], d[1]) for d in cls._order_params(data)])
+
+    @staticmethod
+    def _handle_response(response, decoder=None):
         """Internal helper for handling API responses from the Binance server.
         Raises the appropriate exceptions when necessary; otherwise, returns the
-        response.
+        response decoded by decoder, default: decoding.loads.
         """
-        if not str(self.response.status_code).startswith('2'):
-            raise BinanceAPIException(self.response)
+        if not str(response.status_code).startswith('2'):
+            raise BinanceAPIException(response)
         try:
-            return self.response.json()
+            return (decoder or decoding.loads)(response.content)
         except ValueError:
-            raise BinanceRequestException('Invalid Response: %s' % self.response.text)
+            raise BinanceRequestException('Invalid Response: %s' % response.text)
+
+    @staticmethod
+    def _assets_balance(res):
+        if res:
+            if "balances" in res:
+                balances = {}
+                for balance in res['balances']:
+                    if balance['asset'] == 'BTC':
+                        balances['BTC'] = {}
+                        balances['BTC']['free'] = float(balance['free'])
+                        balances['BTC']['locked'] = float(balance['locked'])
+                    elif balance['asset'] == 'USDT':
+                        balances['USDT'] = {}
+                        balances['USDT']['free'] = float(balance['free'])
+                        balances['USDT']['locked'] = float(balance['locked'])
+                return [True, balances]
+        return [False, None]
+
+    @staticmethod
+    def _price_line(candles_1m):
+        total_data = []
+        for i in range(len(candles_1m)):
+            open = float(candles_1m[i][1])
+            close = float(candles_1m[i][4])
+            single_input = {'time': candles_1m[i][0],
+                            'open': open,
+                            'high': float(candles_1m[i][2]),
+                            'low': float(candles_1m[i][3]),
+                            'close': close,
+                            'volume': float(candles_1m[i][5]),
+                            'action': None}
+            total_data.append(single_input)
+        return total_data
+
+    @staticmethod
+    def _columns_price_line(columns):
+        names = ('time', 'open', 'high', 'low', 'close', 'volume')
+        rows = zip(*[columns[name].tolist() for name in ('open_time', 'open', 'high', 'low', 'close', 'volume')])
+        total_data = []
+        for row in rows:
+            single_input = dict(zip(names, row))
+            single_input['action'] = None
+            total_data.append(single_input)
+        return total_data
+
+    @staticmethod
+    def _order_error_result(ex):
+        """Map a BinanceAPIException raised by an order call, or a BinanceOrderException raised by
+        the local check of the order, to the order result dict.
+
+        :return: {'result': False, 'info': False} for min notional and insufficient balance
+            failures, {'result': False, 'info': message} otherwise
+        """
+        if isinstance(ex, BinanceOrderMinTotalException):
+            print('min notional error!')
+            return {'result': False, 'info': False}
+        elif isinstance(ex, BinanceOrderException):
+            return {'result': False, 'info': ex.message}
+        if ex.code == -1013:
+            if ex.message == 'Filter failure: MIN_NOTIONAL':
+                print('min notional error!')
+                return {'result': False, 'info': False}
+            return {'result': False, 'info': ex.message}
+        elif ex.code == -2010:
+            if ex.message == 'Account has insufficient balance for requested action.':
+                print('insufficient assets')
+                return {'result': False, 'info': False}
+            return {'result': False, 'info': ex.message}
+        return {'result': False, 'info': 'error code: {} msg: {}'.format(ex.code, ex.message)}
 
     @staticmethod
     def _order_params(data):
@@ -902,27 +1520,66 @@ class BinanceLite(object):
         except (ValueError,KeyError):
             return None
 
-    @staticmethod
-    def _date_to_milliseconds(date_str):
+    @classmethod
+    def _str_or_float_to_milliseconds(cls, str_or_float):
+        """Convert timestamp in seconds (float) or UTC date string to milliseconds"""
+        if isinstance(str_or_float, float):
+            return int(str_or_float * 1000)
+        return cls._date_to_milliseconds(str_or_float)
+
+    @classmethod
+    def _date_to_milliseconds(cls, date_str):
         """Convert UTC date to milliseconds
 
         If using offset strings add "UTC" to date string e.g. "now UTC", "11 hours ago UTC"
 
+        Epoch numbers, ISO-8601 dates and "now" or "N seconds|minutes|hours|days|weeks ago" offsets
+        are parsed directly, anything else with dateparser, which is imported on first use.
         See dateparse docs for formats http://dateparser.readthedocs.io/en/latest/
 
-        :param date_str: date in readable format, i.e. "January 01, 2018", "11 hours ago UTC", "now UTC"
-        :type date_str: str
+        :param date_str: date in readable format, i.e. "January 01, 2018", "11 hours ago UTC", "now UTC",
+            "2018-01-01T00:00:00", or epoch seconds or milliseconds, e.g. 1514764800 or "1514764800000"
+        :type date_str: str|int
         """
-        # get epoch value in UTC
-        epoch = datetime.utcfromtimestamp(0).replace(tzinfo=pytz.utc)
+        milliseconds = cls._fast_date_to_milliseconds(date_str)
+        if milliseconds is not None:
+            return milliseconds
+
+        import dateparser
         # parse our date string
-        d = dateparser.parse(date_str)
+        d = dateparser.parse(str(date_str))
         # if the date is not timezone aware apply UTC timezone
         if d.tzinfo is None or d.tzinfo.utcoffset(d) is None:
-            d = d.replace(tzinfo=pytz.utc)
+            d = d.replace(tzinfo=timezone.utc)
 
-        # return the difference in time
-        return int((d - epoch).total_seconds() * 1000.0)
+        return int(d.timestamp() * 1000)
+
+    @staticmethod
+    def _fast_date_to_milliseconds(date_str):
+        """:return: milliseconds, or None if date_str needs dateparser"""
+        if isinstance(date_str, int):
+            if date_str < EPOCH_MIN:
+                return None
+            return date_str if date_str >= EPOCH_MILLISECONDS_FROM else date_str * 1000
+        date_str = date_str.strip()
+        if EPOCH_RE.match(date_str):
+            number = float(date_str)
+            return int(number) if number >= EPOCH_MILLISECONDS_FROM else int(number * 1000)
+        match = RELATIVE_DATE_RE.match(date_str)
+        if match:
+            seconds_ago = int(match.group(1)) * SECONDS_PER_UNIT[match.group(2).lower()] if match.group(1) else 0
+            return int((time.time() - seconds_ago) * 1000)
+        if ISO_DATE_RE.match(date_str):
+            if date_str.endswith(('Z', 'z')):
+                date_str = date_str[:-1] + '+00:00'
+            try:
+                d = datetime.fromisoformat(date_str)
+            except ValueError:
+                return None
+            if d.tzinfo is None:
+                d = d.replace(tzinfo=timezone.utc)
+            return int(d.timestamp() * 1000)
+        return None
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+class ClockSync(object):
+    """Estimates the offset of the local clock to the Binance server clock, by sampling the
+    server time in the background, and corrects the timestamps of signed requests with it.
+
+    Each sample measures the round trip time of a time request and takes the server time as
+    read in the middle of it. The offset is that of the fastest recent sample, which has the
+    smallest error. Once min_samples are collected, recv_window is tightened to what the
+    measured latency and offset spread need, within [min_recv_window, max_recv_window].
+
+    .. code-block:: python
+
+        clock = ClockSync(client)
+        clock.start()  # client timestamps and recvWindow follow the estimate from now on
+        async_client = AsyncBinanceLite(clock=clock)  # shares the estimate
+
+    """
+
+    def __init__(self, client, interval=60, samples=8, min_samples=3, min_recv_window=1000,
+                 max_recv_window=None, margin=250):
+        """
+        :param client: BinanceLite
+        :param interval: seconds between samples
+        :param samples: recent samples the estimate is made from
+        :param min_samples: samples needed before timestamps are corrected and recvWindow tightened
+        :param min_recv_window: smallest recvWindow in milliseconds
+        :param max_recv_window: largest recvWindow in milliseconds, default: client.RECV_WINDOW
+        :param margin: milliseconds added to the measured need
+        """
+        self.client = client
+        self.interval = interval
+        self.min_samples = min_samples
+        self.min_recv_window = min_recv_window
+        self.max_recv_window = max_recv_window if max_recv_window is not None else client.RECV_WINDOW
+        self.margin = margin
+        self._samples = deque(maxlen=samples)
+        self._offset = 0.0
+        self._recv_window = self.max_recv_window
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def synced(self):
+        with self._lock:
+            return len(self._samples) >= self.min_samples
+
+    def timestamp(self):
+        """:return: current server time estimate in milliseconds"""
+        return int(time.time() * 1000 + self._offset)
+
+    def recv_window(self):
+        """:return: recvWindow in milliseconds for signed requests"""
+        return self._recv_window
+
+    def get_estimate(self):
+        """:return: dict with offset, rtt, recv_window in milliseconds and the sample count"""
+        with self._lock:
+            best = min(self._samples) if self._samples else (None, None)
+            return {'offset': self._offset, 'rtt': best[0], 'recv_window': self._recv_window,
+                    'samples': len(self._samples)}
+
+    def sample(self):
+        """Measure the offset once.
+
+        :raises: BinanceRequestException, BinanceAPIException
+        """
+        start = time.time()
+        server_time = self.client.get_server_time()['serverTime']
+        end = time.time()
+        rtt = (end - start) * 1000
+        offset = server_time - (start + end) / 2 * 1000
+        with self._lock:
+            self._samples.append((rtt, offset))
+            self._update()
+
+    def resync(self):
+        """Take a sample now, e.g. after a -1021 timestamp error."""
+        self._wake.set()
+
+    def start(self):
+        """Sample in a background thread and attach to the client."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.client.clock = self
+
+    def stop(self):
+        if self.client.clock is self:
+            self.client.clock = None
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _update(self):
+        if len(self._samples) < self.min_samples:
+            return
+        rtts = [rtt for rtt, _ in self._samples]
+        offsets = [offset for _, offset in self._samples]
+        self._offset = min(self._samples)[1]
+        # a request reaches the server within its rtt, plus the error of the offset estimate
+        need = max(rtts) + (max(offsets) - min(offsets)) + self.margin
+        # whole 100 ms steps, so prepared orders are not rebuilt on every sample
+        window = int(math.ceil(need / 100.0)) * 100
+        self._recv_window = max(self.min_recv_window, min(self.max_recv_window, window))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as ex:
+                print('clock sync error: {}'.format(ex))
+            # sample quickly until the estimate is usable
+            self._wake.wait(self.interval if self.synced else 1)
+            self._wake.clear()
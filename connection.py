@@ -1,21 +1,207 @@
+import json
 import socket
+import threading
+import itertools
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import protocol
+from metrics import LatencyStats
+
+
+SIGNER_HOST = '173.68.217.147'
+SIGNER_PORT = 18956  # socket server port number
+
+
+class SignerClient(object):
+    """Long-lived connection to the signer server.
+
+    Requests are framed (see protocol.py) and tagged with an id, so several of them can be
+    in flight on the same connection. Responses are matched to their requests by a reader
+    thread. A dropped connection fails the pending requests and is re-established on the
+    next call.
+    """
+
+    def __init__(self, host=SIGNER_HOST, port=SIGNER_PORT, timeout=6, retries=1, reconnect_delay=0.2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnect_delay = reconnect_delay
+        self._sock = None
+        self._reader = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self.latency = LatencyStats()
+
+    def sign(self, query_string):
+        """Get signature of query_string.
+
+        :return: hex signature
+        :raises: ConnectionError, socket.timeout, protocol.ProtocolError, protocol.SignerError
+        """
+        payload = self._call(protocol.OP_SIGN, query_string.encode())
+        with self.latency.timer('decode'):
+            return payload.decode()
+
+    def sign_batch(self, query_strings):
+        """Get signatures of several query strings in one round trip.
+
+        :return: list of hex signatures in the order of query_strings
+        :raises: ConnectionError, socket.timeout, protocol.ProtocolError, protocol.SignerError
+        """
+        payload = self._call(protocol.OP_SIGN_BATCH, protocol.pack_batch(query_strings))
+        with self.latency.timer('decode'):
+            signatures = protocol.unpack_batch(payload)
+        if len(signatures) != len(query_strings):
+            raise protocol.ProtocolError('Expected {} signatures, got {}.'.format(
+                len(query_strings), len(signatures)))
+        return signatures
+
+    def submit(self, op, payload):
+        """Send a request without waiting for the reply.
+
+        :return: Future resolved with the response payload
+        """
+        future = Future()
+        with self._lock:
+            sock = self._ensure_connected()
+            request_id = next(self._ids) & 0xFFFFFFFF
+            self._pending[request_id] = future
+        future.sock = sock
+        try:
+            with self.latency.timer('send'):
+                frame = protocol.pack_frame(op, request_id, payload)
+                with self._send_lock:
+                    sock.sendall(frame)
+        except (OSError, protocol.ProtocolError) as ex:
+            self._drop(sock, ex)
+        return future
+
+    def get_latency_stats(self):
+        """Latency of the connect, send, wait and decode phases.
+
+        :return: dict of phase: {'count', 'p50', 'p99', 'max'}, times in milliseconds
+        """
+        return self.latency.summary()
+
+    def get_server_latency_stats(self):
+        """Latency summary of the signer server, see signer.Signer.get_latency_stats.
+
+        :return: dict of phase: {'count', 'p50', 'p99', 'max'}, times in milliseconds
+        :raises: ConnectionError, socket.timeout, protocol.ProtocolError, protocol.SignerError
+        """
+        return json.loads(self._call(protocol.OP_STATS, b'').decode())
+
+    def close(self):
+        with self._lock:
+            sock = self._sock
+        if sock:
+            self._drop(sock, ConnectionError('Client closed.'))
+
+    def _call(self, op, payload):
+        attempt = 0
+        while True:
+            future = None
+            try:
+                future = self.submit(op, payload)
+                with self.latency.timer('wait'):
+                    return future.result(self.timeout)
+            except (OSError, protocol.ProtocolError, FutureTimeoutError) as ex:
+                if isinstance(ex, FutureTimeoutError) and future is not None and not future.done():
+                    # signer stopped answering, do not reuse this connection
+                    self._drop(future.sock, ConnectionError('Signer did not reply in time.'))
+                    raise socket.timeout('Signer did not reply in time.')
+                # connection dropped, reconnect and resend
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                time.sleep(self.reconnect_delay)
+
+    def _ensure_connected(self):
+        if self._sock is None:
+            with self.latency.timer('connect'):
+                sock = socket.create_connection((self.host, self.port), self.timeout)
+            # reads are done by the reader thread, which waits for as long as needed
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+            self._reader = threading.Thread(target=self._read_loop, args=(sock,), daemon=True)
+            self._reader.start()
+        return self._sock
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                frame = protocol.recv_frame(sock)
+                if frame is None:
+                    raise ConnectionError('Connection closed by signer.')
+                op, request_id, payload = frame
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if op == protocol.OP_ERROR:
+                    future.set_exception(protocol.SignerError(payload.decode()))
+                else:
+                    future.set_result(payload)
+        except (OSError, protocol.ProtocolError) as ex:
+            self._drop(sock, ex)
+
+    def _drop(self, sock, ex):
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            pending = self._pending
+            self._pending = {}
+        try:
+            # shutdown wakes up the reader thread blocked on recv
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ex)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SignerClient()
+        return _client
 
 
 def get_signature(data_to_sign):
     try:
-        print('connecting to zero server...')
-        host = '173.68.217.147'
-        port = 18956  # socket server port number
-        client_socket = socket.socket()  # instantiate
-        client_socket.settimeout(6)
-        client_socket.connect((host, port))  # connect to the server
-        data_to_sign_bytes = data_to_sign.encode()
-        client_socket.send(data_to_sign_bytes)  # send message
-        data = client_socket.recv(64).decode()  # receive response
-        client_socket.close()  # close the connection
-        if data:
-            print('sign received.')
-            return [data]
+        signature = get_client().sign(data_to_sign)
+        if signature:
+            return [signature]
+        else:
+            print('SIGNING ERROR.')
+            return [False, 'SIGNING ERROR.']
+    except Exception as ex:
+        print('Error:')
+        print(ex)
+        return [False, str(ex)]
+
+
+def get_signatures(data_to_sign):
+    """Sign a list of query strings in one round trip.
+
+    :return: [signatures] or [False, error]
+    """
+    try:
+        signatures = get_client().sign_batch(data_to_sign)
+        if all(signatures):
+            return [signatures]
         else:
             print('SIGNING ERROR.')
             return [False, 'SIGNING ERROR.']
@@ -0,0 +1,94 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _json_loads(content):
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    return json.loads(content)
+
+
+# fastest first, all of them raise ValueError subclasses on invalid input
+BACKENDS = [name for name, module in (('orjson', orjson), ('ujson', ujson)) if module is not None] + ['json']
+
+_LOADS = {
+    'orjson': orjson.loads if orjson is not None else None,
+    'ujson': ujson.loads if ujson is not None else None,
+    'json': _json_loads,
+}
+
+_backend = BACKENDS[0]
+_loads = _LOADS[_backend]
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """Select the JSON decoder, one of BACKENDS.
+
+    :raises: ValueError if the backend is not installed
+    """
+    global _backend, _loads
+    if name not in BACKENDS:
+        raise ValueError('JSON backend {} is not available, use one of {}'.format(name, BACKENDS))
+    _backend = name
+    _loads = _LOADS[name]
+
+
+def loads(content):
+    """Decode a response body, bytes or str, with the selected backend."""
+    return _loads(content)
+
+
+# fields of a kline row
+KLINE_FIELDS = 12
+
+
+def decode_klines(content):
+    """Decode a klines response body straight to numbers, without building the nested lists.
+
+    Binance klines are flat rows of numbers and quoted decimals, so dropping brackets and quotes
+    leaves a comma separated list of numbers. A fast backend decodes it as one flat JSON array,
+    with the json backend numpy parses it in one pass.
+
+    :return: float64 array of shape (n, 12), columns as in the klines response
+    """
+    import numpy as np
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    numbers = content.translate(None, b'[]"')
+    if not numbers.strip():
+        return np.empty((0, KLINE_FIELDS), dtype=np.float64)
+    if _backend == 'json':
+        values = np.fromstring(numbers, dtype=np.float64, sep=',')
+    else:
+        values = np.array(_loads(b'[' + numbers + b']'), dtype=np.float64)
+    return values.reshape(-1, KLINE_FIELDS)
+
+
+def decode_depth(content):
+    """Decode a depth response body with bids and asks as numbers.
+
+    :return: dict with lastUpdateId and bids and asks float64 arrays of shape (n, 2), price and
+        quantity columns, each column contiguous
+    """
+    import numpy as np
+    depth = loads(content)
+    for side in ('bids', 'asks'):
+        levels = depth[side]
+        if levels and len(levels[0]) > 2:
+            # older api versions send an ignored third field per level
+            levels = [level[:2] for level in levels]
+        depth[side] = np.asfortranarray(np.array(levels, dtype=np.float64).reshape(-1, 2))
+    return depth
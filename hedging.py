@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from exceptions import BinanceAPIException, BinanceRequestException
+
+
+class HedgingPolicy(object):
+    """Hedging and retries for idempotent reads, unsigned GETs only.
+
+    A request that has not answered within the hedge delay gets a second, identical request
+    and the first answer wins. The delay is the percentile of the endpoint's network latency,
+    from the client's request metrics, within [min_delay, max_delay]. A hedge is sent only if
+    the rate limiter has the weight for it right away. Connection errors, timeouts, 5xx
+    responses and unreadable bodies are retried with jittered exponential backoff.
+
+    .. code-block:: python
+
+        client = BinanceLite(hedging=HedgingPolicy())
+        client.get_order_book(symbol='BTCUSDT')  # hedged after the p95 latency of depth
+
+    """
+
+    def __init__(self, percentile=95, min_delay=0.05, max_delay=1.0, min_samples=20, retries=2,
+                 backoff=0.1, max_backoff=2.0, timeout=(3.05, 5), max_workers=16):
+        """
+        :param percentile: latency percentile after which a hedge is sent
+        :param min_delay: shortest hedge delay in seconds
+        :param max_delay: longest hedge delay in seconds, also used until min_samples are recorded
+        :param min_samples: latency samples of an endpoint needed to use its percentile
+        :param retries: retries of transient errors
+        :param backoff: first retry delay in seconds, doubled on each retry, with full jitter
+        :param max_backoff: longest retry delay in seconds
+        :param timeout: requests timeout of every attempt, seconds or (connect, read)
+        :param max_workers: requests in flight at once
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._stats = {'requests': 0, 'hedges': 0, 'hedge_wins': 0, 'hedges_skipped': 0, 'retries': 0}
+        self._lock = threading.Lock()
+
+    def call(self, client, path, params, send):
+        """Run a read with hedging and retries.
+
+        :param client: BinanceLite, for its metrics and limiter
+        :param path: endpoint path, e.g. depth
+        :param params: request params, for the request weight
+        :param send: callable(limit), sends one attempt, takes the rate limiter weight if limit
+        :returns: what send returned for the first attempt to answer
+        """
+        self._count('requests')
+        attempt = 0
+        while True:
+            try:
+                return self._hedged(client, path, params, send)
+            except Exception as ex:
+                if attempt >= self.retries or not self.is_transient(ex):
+                    raise
+                attempt += 1
+                self._count('retries')
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
+
+    def hedge_delay(self, client, path):
+        delay = client.metrics.percentile('get', path, 'network', self.percentile, self.min_samples)
+        if delay is None:
+            return self.max_delay
+        return max(self.min_delay, min(self.max_delay, delay))
+
+    def get_stats(self):
+        """:return: dict with counts of requests, hedges sent, hedges that answered first,
+            hedges skipped for lack of weight and retries
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def is_transient(ex):
+        if isinstance(ex, BinanceAPIException):
+            return ex.status_code >= 500
+        return isinstance(ex, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                               BinanceRequestException))
+
+    def _hedged(self, client, path, params, send):
+        first = self._executor.submit(send, True)
+        done, _ = wait([first], timeout=self.hedge_delay(client, path))
+        if done:
+            return first.result()
+        if not client.limiter.try_acquire('get', path, params):
+            self._count('hedges_skipped')
+            return first.result()
+        self._count('hedges')
+        hedge = self._executor.submit(send, False)
+        pending = {first, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    return future.result()
+        # both failed, report the first request's error
+        return first.result()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
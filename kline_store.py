@@ -0,0 +1,262 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+
+
+KLINES_DIR_PATH = 'klines'
+
+# columns of a kline row as returned by the klines endpoint, the last "ignore" field is dropped
+KLINE_COLUMNS = [
+    ('open_time', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64),
+    ('quote_volume', np.float64),
+    ('trades', np.int64),
+    ('taker_buy_base_volume', np.float64),
+    ('taker_buy_quote_volume', np.float64),
+]
+
+
+def _fields(klines):
+    # numeric pages from decoding.decode_klines are sliced by column, lists are transposed
+    if isinstance(klines, np.ndarray):
+        return klines.T
+    return list(zip(*klines))
+
+
+def klines_to_columns(klines):
+    """Convert raw klines rows, or a numeric page, to a dict of column name: numpy array."""
+    if not len(klines):
+        return {name: np.empty(0, dtype=dtype) for name, dtype in KLINE_COLUMNS}
+    fields = _fields(klines)
+    return {name: np.array(fields[i], dtype=dtype) for i, (name, dtype) in enumerate(KLINE_COLUMNS)}
+
+
+# OHLCV line, the fields of get_price_line dicts
+PRICE_LINE_DTYPE = np.dtype([
+    ('time', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
+
+def klines_to_price_line(klines):
+    """Convert raw klines rows, or a numeric page, to a PRICE_LINE_DTYPE structured array,
+    column by column.
+    """
+    price_line = np.empty(len(klines), dtype=PRICE_LINE_DTYPE)
+    if len(klines):
+        fields = _fields(klines)
+        for i, name in enumerate(PRICE_LINE_DTYPE.names):
+            price_line[name] = np.array(fields[i], dtype=PRICE_LINE_DTYPE[name])
+    return price_line
+
+
+def columns_to_price_line(columns):
+    """Convert a dict of kline columns to a PRICE_LINE_DTYPE structured array."""
+    price_line = np.empty(len(columns['open_time']), dtype=PRICE_LINE_DTYPE)
+    price_line['time'] = columns['open_time']
+    for name in PRICE_LINE_DTYPE.names[1:]:
+        price_line[name] = columns[name]
+    return price_line
+
+
+class KlineStore(object):
+    """On-disk kline cache, one directory per symbol and interval with a raw binary file per
+    column. Files are memory-mapped on read. Covered time ranges are kept next to them, so only
+    missing ranges have to be downloaded.
+
+    New klines after the stored ones are appended in place, the coverage is updated after them.
+    Anything else writes a new generation directory with all columns and the coverage, and then
+    switches the CURRENT file to it, so files that readers have mapped are never replaced and a
+    crash leaves either the old or the new generation. Columns left at different lengths by a
+    crash during an append are cut to the shortest on load.
+    """
+
+    COVERAGE_FILE = 'coverage.json'
+    CURRENT_FILE = 'CURRENT'
+
+    def __init__(self, path=KLINES_DIR_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def get(self, symbol, interval, start_ts, end_ts):
+        """Get stored klines with open time in [start_ts, end_ts].
+
+        :return: dict of column name: numpy array, memory-mapped
+        """
+        columns = self._load(symbol, interval)
+        open_time = columns['open_time']
+        lo = np.searchsorted(open_time, start_ts, side='left')
+        hi = np.searchsorted(open_time, end_ts, side='right')
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def missing(self, symbol, interval, start_ts, end_ts):
+        """:return: list of (start_ts, end_ts) ranges in [start_ts, end_ts] that are not stored"""
+        gaps = []
+        cursor = start_ts
+        for covered_start, covered_end in self._read_coverage(symbol, interval):
+            if covered_end < cursor:
+                continue
+            if covered_start > end_ts:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start - 1))
+            cursor = max(cursor, covered_end + 1)
+        if cursor <= end_ts:
+            gaps.append((cursor, end_ts))
+        return gaps
+
+    def update(self, symbol, interval, klines, start_ts, end_ts):
+        """Store klines downloaded for range [start_ts, end_ts] and mark the range as covered.
+        Klines must be closed, ranges must not reach past the last closed kline.
+        """
+        new = klines_to_columns(klines)
+        with self._lock:
+            columns = self._load(symbol, interval)
+            open_time = columns['open_time']
+            new_time = new['open_time']
+            if not len(open_time) or not len(new_time) or new_time[0] > open_time[-1]:
+                self._append(symbol, interval, columns, new)
+                self._write_coverage(self._generation_dir(symbol, interval),
+                                     self._add_coverage(symbol, interval, start_ts, end_ts))
+            else:
+                self._rewrite(symbol, interval, columns, new, self._add_coverage(symbol, interval, start_ts, end_ts))
+                # release the maps of the replaced generation before removing it
+                columns = open_time = None
+                self._remove_old_generations(symbol, interval)
+
+    @staticmethod
+    def concat(columns, klines):
+        """Append raw klines rows to columns.
+
+        :return: new dict of column name: numpy array
+        """
+        new = klines_to_columns(klines)
+        return {name: np.concatenate([columns[name], new[name]]) for name, _ in KLINE_COLUMNS}
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.path, '{}_{}'.format(symbol, interval))
+
+    def _current(self, symbol, interval):
+        """:return: number of the current generation, 0 for files directly in the symbol directory"""
+        path = os.path.join(self._dir(symbol, interval), self.CURRENT_FILE)
+        if not os.path.isfile(path):
+            return 0
+        with open(path) as f:
+            return int(f.read())
+
+    def _generation_dir(self, symbol, interval, generation=None):
+        if generation is None:
+            generation = self._current(symbol, interval)
+        if not generation:
+            return self._dir(symbol, interval)
+        return os.path.join(self._dir(symbol, interval), 'gen{}'.format(generation))
+
+    def _load(self, symbol, interval):
+        directory = self._generation_dir(symbol, interval)
+        columns = {}
+        for name, dtype in KLINE_COLUMNS:
+            path = os.path.join(directory, name + '.bin')
+            if os.path.isfile(path) and os.path.getsize(path) >= np.dtype(dtype).itemsize:
+                columns[name] = np.memmap(path, dtype=dtype, mode='r')
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+        # an append cut short by a crash leaves some columns longer, their tail is not covered
+        length = min(len(column) for column in columns.values())
+        return {name: column[:length] for name, column in columns.items()}
+
+    def _append(self, symbol, interval, columns, new):
+        if not len(new['open_time']):
+            return
+        directory = self._generation_dir(symbol, interval)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        length = len(columns['open_time'])
+        for name, dtype in KLINE_COLUMNS:
+            with open(os.path.join(directory, name + '.bin'), 'ab') as f:
+                # drop the rows of a crashed append first
+                if f.tell() != length * np.dtype(dtype).itemsize:
+                    f.truncate(length * np.dtype(dtype).itemsize)
+                    f.seek(0, os.SEEK_END)
+                f.write(new[name].astype(dtype).tobytes())
+
+    def _rewrite(self, symbol, interval, columns, new, coverage):
+        merged = {name: np.concatenate([np.asarray(columns[name]), new[name]]) for name, _ in KLINE_COLUMNS}
+        # sort by open time and drop duplicates, unique looks from the end so downloaded rows win
+        open_time = merged['open_time']
+        _, last = np.unique(open_time[::-1], return_index=True)
+        keep = len(open_time) - 1 - last
+        generation = self._current(symbol, interval) + 1
+        directory = self._generation_dir(symbol, interval, generation)
+        if os.path.isdir(directory):
+            # left by a crash before the switch
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        for name, dtype in KLINE_COLUMNS:
+            with open(os.path.join(directory, name + '.bin'), 'wb') as f:
+                f.write(merged[name][keep].astype(dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        self._write_coverage(directory, coverage)
+        # the switch, files that are mapped are never replaced
+        path = os.path.join(self._dir(symbol, interval), self.CURRENT_FILE)
+        with open(path + '.tmp', 'w') as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _remove_old_generations(self, symbol, interval):
+        """Remove generations before the current one, files still mapped are left for the next
+        rewrite.
+        """
+        directory = self._dir(symbol, interval)
+        current = 'gen{}'.format(self._current(symbol, interval))
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            try:
+                if entry.startswith('gen') and entry != current:
+                    shutil.rmtree(path)
+                elif entry.endswith('.bin') or entry == self.COVERAGE_FILE:
+                    # files of the layout without generations
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _read_coverage(self, symbol, interval):
+        path = os.path.join(self._generation_dir(symbol, interval), self.COVERAGE_FILE)
+        if not os.path.isfile(path):
+            return []
+        with open(path) as f:
+            return [tuple(covered) for covered in json.load(f)]
+
+    def _add_coverage(self, symbol, interval, start_ts, end_ts):
+        """:return: the coverage with [start_ts, end_ts] added, as a list of merged ranges"""
+        ranges = sorted(self._read_coverage(symbol, interval) + [(start_ts, end_ts)])
+        merged = []
+        for range_start, range_end in ranges:
+            if merged and range_start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        return merged
+
+    def _write_coverage(self, directory, coverage):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, self.COVERAGE_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(coverage, f)
+        os.replace(path + '.tmp', path)
@@ -1,26 +1,102 @@
+import atexit
 import json
 import os
+import threading
+import time
 from datetime import datetime
 
 
 LOG_DIR_PATH = 'log'
 
+GENERAL = 'general'
+SPECIFIC = 'specific'
+
 
 class Log:
-    def __init__(self):
+    """JSON lines log with a general and a specific channel, each in its own file.
+
+    Files stay open. append only queues the record, a background thread writes the queue when
+    buffer_size records are waiting or every flush_interval seconds, and on exit. Thread-safe.
+
+    Durability: with flush_on_error, an error record and everything queued before it is written
+    before append returns. With fsync, every write is also synced to disk.
+    """
+
+    def __init__(self, flush_interval=1.0, buffer_size=256, flush_on_error=True, fsync=False):
+        """
+        :param flush_interval: max seconds a record waits in memory
+        :param buffer_size: records queued before the writer is woken up early
+        :param flush_on_error: write at once when an error is appended
+        :param fsync: os.fsync after every write
+        """
         # make log dir
         if not os.path.isdir(LOG_DIR_PATH):
             os.mkdir(LOG_DIR_PATH)
 
-        # make log file path
+        # make log file paths, general keeps the name of the single file of earlier versions
         date_time_now = self.get_log_file_date_time()
         self.path_log = os.path.join(LOG_DIR_PATH, date_time_now + '.json')
-        # make log file
-        if not os.path.isfile(self.path_log):
-            with open(self.path_log, 'x'):
-                pass
+        self.path_specific = os.path.join(LOG_DIR_PATH, date_time_now + '_specific.json')
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.flush_on_error = flush_on_error
+        self.fsync = fsync
+        self._files = {GENERAL: open(self.path_log, 'a'), SPECIFIC: open(self.path_specific, 'a')}
+        self._queue = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, data: str, is_error=False):
+        """Log to the general channel."""
+        self._append(GENERAL, data, is_error)
+
+    def append_general(self, data: str, is_error=False):
+        """Log to the general channel: events and errors."""
+        self._append(GENERAL, data, is_error)
 
-    def append(self, data:str):
+    def append_specific(self, data: str, is_error=False):
+        """Log to the specific channel: per-request details such as signed query strings."""
+        self._append(SPECIFIC, data, is_error)
+
+    def flush(self):
+        """Write all queued records."""
+        with self._write_lock:
+            with self._lock:
+                queue = self._queue
+                self._queue = []
+            if not queue:
+                return
+            channels = set()
+            for channel, timestamp, data in queue:
+                f = self._files[channel]
+                json.dump({'time': self.format_time(timestamp), 'info': data}, f)
+                f.write(os.linesep)
+                channels.add(channel)
+            for channel in channels:
+                f = self._files[channel]
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def close(self):
+        """Write what is queued and close the files. Appends after close are dropped."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join(5)
+        self.flush()
+        with self._write_lock:
+            for f in self._files.values():
+                f.close()
+
+    def _append(self, channel, data, is_error):
         if not isinstance(data, str):
             tp = data.__class__.__name__
             print('Log error: expected type str, got {}. try-parsing to str...'.format(tp))
@@ -30,10 +106,24 @@ class Log:
             except Exception as ex:
                 data = 'Parsing Error : {}'.format(ex)
                 print(data)
-        date_time_now = self.date_time_now()
-        with open(self.path_log, 'a') as f:
-            json.dump({'time': date_time_now, 'info': data}, f)
-            f.write(os.linesep)
+        with self._lock:
+            if self._closed:
+                return
+            self._queue.append((channel, time.time(), data))
+            full = len(self._queue) >= self.buffer_size
+        if is_error and self.flush_on_error:
+            self.flush()
+        elif full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as ex:
+                print('Log flush error: {}'.format(ex))
 
     @staticmethod
     def read_log_file(log_file_name):
@@ -46,14 +136,35 @@ class Log:
             print('Cannot find file at: {}'.format(path))
         return log
 
+    @staticmethod
+    def format_time(timestamp):
+        return datetime.fromtimestamp(timestamp).strftime("%d.%m %H:%M:%S")
+
     @staticmethod
     def date_time_now():
-        now = datetime.now()
-        time_now_str = now.strftime("%d.%m %H:%M:%S")
-        return time_now_str
+        return Log.format_time(time.time())
 
     @staticmethod
     def get_log_file_date_time():
         now = datetime.now()
         time_now_str = now.strftime("%d.%m_%H-%M")
-        return time_now_str
\ No newline at end of file
+        return time_now_str
+
+
+class NullLog:
+    """Log with the channels of Log that drops everything, for clients created without a log."""
+
+    def append(self, data, is_error=False):
+        pass
+
+    def append_general(self, data, is_error=False):
+        pass
+
+    def append_specific(self, data, is_error=False):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Histogram(object):
+    """Latency samples of one phase. Keeps the last max_samples values, percentiles are
+    computed from them on query.
+    """
+
+    def __init__(self, max_samples=10000):
+        self._samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, value):
+        self._samples.append(value)
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """:param p: percentile in range 0-100"""
+        return self._percentile(sorted(self._samples), p)
+
+    def summary(self, scale=1000):
+        """:param scale: factor applied to the values, default: seconds to milliseconds
+        :return: dict with count, p50, p99 and max
+        """
+        samples = sorted(self._samples)
+        if not samples:
+            return {'count': 0, 'p50': None, 'p99': None, 'max': None}
+        return {'count': self.count,
+                'p50': self._percentile(samples, 50) * scale,
+                'p99': self._percentile(samples, 99) * scale,
+                'max': self.max * scale}
+
+    @staticmethod
+    def _percentile(samples, p):
+        if not samples:
+            return None
+        return samples[int(round(p / 100.0 * (len(samples) - 1)))]
+
+
+class LatencyStats(object):
+    """Thread-safe set of histograms, one per phase."""
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = Histogram(self.max_samples)
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def percentile(self, phase, p, min_count=1):
+        """:return: percentile p of phase, None with fewer than min_count samples"""
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None or histogram.count < min_count:
+                return None
+            return histogram.percentile(p)
+
+    def summary(self):
+        """Get latency of every phase.
+
+        :return: dict of phase: {'count', 'p50', 'p99', 'max'}, times in milliseconds
+
+        .. code-block:: python
+
+            {
+                'hmac': {'count': 120, 'p50': 0.011, 'p99': 0.034, 'max': 0.051},
+                'send': {'count': 120, 'p50': 0.042, 'p99': 0.117, 'max': 0.208}
+            }
+
+        """
+        with self._lock:
+            return {phase: histogram.summary() for phase, histogram in self._histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+class RequestMetrics(object):
+    """Thread-safe counters, latencies and payload sizes of REST calls, per endpoint.
+
+    Endpoints are keyed 'METHOD path', e.g. 'GET klines'. Latency phases are sign, network,
+    decode and total. Status is the HTTP status code, or 'error' when no response came.
+    """
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, method, path, status, timings, request_bytes=0, response_bytes=0):
+        """
+        :param timings: dict of phase: seconds
+        """
+        key = '{} {}'.format(method.upper(), path)
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = {'status': {},
+                                                   'latency': LatencyStats(self.max_samples),
+                                                   'request_bytes': Histogram(self.max_samples),
+                                                   'response_bytes': Histogram(self.max_samples)}
+            status = str(status)
+            endpoint['status'][status] = endpoint['status'].get(status, 0) + 1
+            endpoint['request_bytes'].record(request_bytes)
+            endpoint['response_bytes'].record(response_bytes)
+        for phase, seconds in timings.items():
+            endpoint['latency'].record(phase, seconds)
+
+    def snapshot(self):
+        """Get the metrics of every endpoint.
+
+        :return: dict of endpoint: metrics, times in milliseconds, sizes in bytes
+
+        .. code-block:: python
+
+            {
+                'GET klines': {
+                    'count': 48,
+                    'errors': 1,
+                    'status': {'200': 47, '429': 1},
+                    'latency': {
+                        'network': {'count': 48, 'p50': 81.2, 'p99': 240.5, 'max': 251.0},
+                        'decode': {'count': 48, 'p50': 4.1, 'p99': 6.3, 'max': 6.9},
+                        'total': {'count': 48, 'p50': 85.7, 'p99': 246.1, 'max': 257.3}
+                    },
+                    'request_bytes': {'count': 48, 'p50': 75, 'p99': 75, 'max': 75},
+                    'response_bytes': {'count': 48, 'p50': 164013, 'p99': 164208, 'max': 164208}
+                }
+            }
+
+        """
+        with self._lock:
+            endpoints = dict(self._endpoints)
+            result = {}
+            for key, endpoint in endpoints.items():
+                status = dict(endpoint['status'])
+                result[key] = {
+                    'count': sum(status.values()),
+                    'errors': sum(count for code, count in status.items() if not code.startswith('2')),
+                    'status': status,
+                    'request_bytes': endpoint['request_bytes'].summary(scale=1),
+                    'response_bytes': endpoint['response_bytes'].summary(scale=1),
+                }
+        for key, endpoint in endpoints.items():
+            result[key]['latency'] = endpoint['latency'].summary()
+        return result
+
+    def percentile(self, method, path, phase, p, min_count=1):
+        """:return: percentile p of phase of the endpoint in seconds, None with fewer than min_count samples"""
+        key = '{} {}'.format(method.upper(), path)
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            return None
+        return endpoint['latency'].percentile(phase, p, min_count)
+
+    def export(self, path):
+        """Write the snapshot to path as JSON.
+
+        :return: the snapshot
+        """
+        snapshot = self.snapshot()
+        with open(path, 'w') as f:
+            json.dump(snapshot, f, indent=2, sort_keys=True)
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
@@ -0,0 +1,229 @@
+import heapq
+import threading
+import time
+from collections import deque
+from exceptions import BinanceRequestException
+
+
+class BookSide(object):
+    """Price levels of one side of the book.
+
+    Quantities are kept in a dict, prices in a heap ordered best first. Removed prices are
+    dropped from the heap lazily, but never left on its top, so updates cost O(log n) and
+    the best level is read in O(1).
+    """
+
+    def __init__(self, descending):
+        self._sign = -1 if descending else 1
+        self._levels = {}
+        self._heap = []
+        self._in_heap = set()
+
+    def __len__(self):
+        return len(self._levels)
+
+    def set(self, price, quantity):
+        """Set quantity at price, quantity 0 removes the level."""
+        if quantity:
+            self._levels[price] = quantity
+            if price not in self._in_heap:
+                heapq.heappush(self._heap, self._sign * price)
+                self._in_heap.add(price)
+        elif self._levels.pop(price, None) is not None:
+            self._drop_stale_top()
+            if len(self._heap) > 2 * len(self._levels) + 64:
+                self._compact()
+
+    def best(self):
+        """:return: (price, quantity) of the best level or None if empty"""
+        if not self._heap:
+            return None
+        price = self._sign * self._heap[0]
+        return price, self._levels[price]
+
+    def top(self, n):
+        """:return: list of n best (price, quantity) levels"""
+        if self._sign < 0:
+            prices = heapq.nlargest(n, self._levels)
+        else:
+            prices = heapq.nsmallest(n, self._levels)
+        return [(price, self._levels[price]) for price in prices]
+
+    def clear(self):
+        self._levels = {}
+        self._heap = []
+        self._in_heap = set()
+
+    def _drop_stale_top(self):
+        heap = self._heap
+        while heap and self._sign * heap[0] not in self._levels:
+            self._in_heap.discard(self._sign * heapq.heappop(heap))
+
+    def _compact(self):
+        self._heap = [self._sign * price for price in self._levels]
+        heapq.heapify(self._heap)
+        self._in_heap = set(self._levels)
+
+
+class LocalOrderBook(object):
+    """Order book kept up to date from a depth snapshot and diff depth events.
+
+    Events come from any feed: a depth stream, a recorded file or a test stand-in. Pass them to
+    on_depth_event, or hand an iterable of events to run(). The snapshot is taken from
+    client.get_order_book, so any object with that method can serve it.
+
+    While unsynced, at most one snapshot request is in flight, made without holding the lock.
+    After a snapshot that did not sync the book, the next one waits for the backoff delay and
+    for events past the last snapshot, so a run of gaps does not cost a snapshot per event.
+
+    Follows https://github.com/binance-exchange/binance-official-api-docs/blob/master/web-socket-streams.md#how-to-manage-a-local-order-book-correctly
+    """
+
+    def __init__(self, client, symbol, limit=1000, max_buffered_events=10000, on_update=None,
+                 min_resync_delay=0.25, max_resync_delay=10):
+        """
+        :param client: BinanceLite or any object with get_order_book
+        :param symbol: required e.g BNBBTC
+        :param limit: depth of the snapshot
+        :param max_buffered_events: events kept while waiting for the snapshot
+        :param on_update: optional - callable(book), called after every applied event
+        :param min_resync_delay: seconds to wait after a snapshot that did not sync the book,
+            doubled on every further one
+        :param max_resync_delay: longest wait between snapshots in seconds
+        """
+        self.client = client
+        self.symbol = symbol
+        self.limit = limit
+        self.on_update = on_update
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = None
+        self.synced = False
+        self._first_event = True
+        self._buffer = deque(maxlen=max_buffered_events)
+        self.min_resync_delay = min_resync_delay
+        self.max_resync_delay = max_resync_delay
+        self._resync_delay = 0
+        self._next_sync = 0.0
+        self._snapshot_update_id = None
+        self._fetching = False
+        self._lock = threading.RLock()
+
+    def best_bid(self):
+        """:return: (price, quantity) or None"""
+        with self._lock:
+            return self.bids.best()
+
+    def best_ask(self):
+        """:return: (price, quantity) or None"""
+        with self._lock:
+            return self.asks.best()
+
+    def get_depth(self, n=10):
+        """:return: {'lastUpdateId': int, 'bids': [(price, quantity)], 'asks': [(price, quantity)]}"""
+        with self._lock:
+            return {'lastUpdateId': self.last_update_id,
+                    'bids': self.bids.top(n),
+                    'asks': self.asks.top(n)}
+
+    def run(self, feed):
+        """Apply every event of feed, e.g. a list of recorded events or a generator reading a stream."""
+        for event in feed:
+            self.on_depth_event(event)
+
+    def on_depth_event(self, event):
+        """Apply a depthUpdate event. Until the book is synced events are buffered and a snapshot
+        is requested, see the class docs for how often.
+        """
+        # combined streams wrap the payload
+        event = event.get('data', event)
+        with self._lock:
+            if self.synced:
+                self._apply(event)
+                return
+            self._buffer.append(event)
+            if not self._should_sync():
+                return
+            self._fetching = True
+        try:
+            self.sync()
+        except Exception as ex:
+            print('order book {} snapshot error: {}'.format(self.symbol, ex))
+            with self._lock:
+                self._back_off()
+        finally:
+            with self._lock:
+                self._fetching = False
+
+    def sync(self):
+        """Load a fresh snapshot and replay the buffered events on top of it. The snapshot is
+        requested without holding the lock.
+
+        :raises: BinanceRequestException if the snapshot cannot be read
+        """
+        result = self.client.get_order_book(symbol=self.symbol, limit=self.limit)
+        if not result[0]:
+            raise BinanceRequestException('Order book snapshot error: {}'.format(result[1]))
+        with self._lock:
+            self._load(result[1])
+
+    def _should_sync(self):
+        if self._fetching or time.monotonic() < self._next_sync:
+            return False
+        # a snapshot newer than every buffered event cannot be followed yet
+        return self._snapshot_update_id is None or self._buffer[-1]['u'] > self._snapshot_update_id
+
+    def _back_off(self):
+        self._resync_delay = min(self.max_resync_delay, max(self.min_resync_delay, self._resync_delay * 2))
+        self._next_sync = time.monotonic() + self._resync_delay
+
+    def _load(self, snapshot):
+        self.bids.clear()
+        self.asks.clear()
+        for price, quantity in self._levels(snapshot['bids']):
+            self.bids.set(price, quantity)
+        for price, quantity in self._levels(snapshot['asks']):
+            self.asks.set(price, quantity)
+        self.last_update_id = snapshot['lastUpdateId']
+        self.synced = True
+        self._first_event = True
+        buffered = list(self._buffer)
+        self._buffer.clear()
+        for event in buffered:
+            if not self.synced:
+                # gap found while replaying, keep the rest for the next snapshot
+                self._buffer.append(event)
+            else:
+                self._apply(event)
+        self._snapshot_update_id = snapshot['lastUpdateId']
+        if self.synced:
+            self._resync_delay = 0
+            self._next_sync = 0.0
+        else:
+            self._back_off()
+
+    def _apply(self, event):
+        first_id, final_id = event['U'], event['u']
+        if final_id <= self.last_update_id:
+            return  # older than the book
+        if self._first_event:
+            in_sequence = first_id <= self.last_update_id + 1
+        else:
+            in_sequence = first_id == self.last_update_id + 1
+        if not in_sequence:
+            # missed events, wait for the next event and take a new snapshot
+            self.synced = False
+            self._buffer.append(event)
+            return
+        self._first_event = False
+        for price, quantity in self._levels(event['b']):
+            self.bids.set(price, quantity)
+        for price, quantity in self._levels(event['a']):
+            self.asks.set(price, quantity)
+        self.last_update_id = final_id
+        if self.on_update:
+            self.on_update(self)
+
+    @staticmethod
+    def _levels(levels):
+        return ((float(level[0]), float(level[1])) for level in levels)
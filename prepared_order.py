@@ -0,0 +1,96 @@
+import time
+from symbol_info import to_decimal, format_decimal
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+# filled in on every submission
+VARIABLE_PARAMS = ('price', 'quantity', 'timestamp')
+
+
+class PreparedOrder(object):
+    """Order of a fixed shape, for placing the same kind of order many times.
+
+    The canonical query string, params sorted by name, is built once with placeholders for
+    price, quantity and timestamp. A submission fills them in, signs the string and posts it as
+    the request body, skipping the param sorting and query building of create_order.
+    Create it with BinanceLite.prepare_order.
+
+    .. code-block:: python
+
+        buy = client.prepare_order(symbol='BTCUSDT', side='BUY', type='LIMIT_MAKER')
+        buy.submit(price=30000, quantity=0.001)
+        buy.submit(price=30010, quantity=0.002)
+
+    """
+
+    def __init__(self, client, test=False, check=True, **params):
+        """
+        :param client: BinanceLite
+        :param test: post to order/test, the order is validated but not placed
+        :param check: quantize and check price and quantity with the symbol filters on submit
+        :param params: static order params, symbol, side, type, timeInForce, newOrderRespType...
+        """
+        for name in VARIABLE_PARAMS:
+            if name in params:
+                raise ValueError('{} is set on submit, not in the template'.format(name))
+        self.client = client
+        self.check = check
+        self.path = 'order/test' if test else 'order'
+        self.uri = client._create_api_uri(self.path, True, client.PRIVATE_API_VERSION)
+        self.params = params
+        self.recv_window = None
+        self.template = None
+        self.build()
+
+    def build(self, recv_window=None):
+        """(Re)build the query string template, with the client's current recvWindow by default."""
+        self.recv_window = recv_window if recv_window is not None else self.client._recv_window()
+        params = dict((key, value) for key, value in self.params.items() if value is not None)
+        params['recvWindow'] = self.recv_window
+        parts = ['{}={}'.format(key, str(value).replace('{', '{{').replace('}', '}}'))
+                 for key, value in params.items()]
+        parts += ['{0}={{{0}}}'.format(name) for name in VARIABLE_PARAMS]
+        self.template = '&'.join(sorted(parts, key=lambda part: part.split('=', 1)[0]))
+
+    def query_string(self, price, quantity, timestamp):
+        """:return: canonical query string of a submission, without signature. Price and quantity
+            are written in plain notation, 0.00001 as 0.00001 and not 1e-05
+        """
+        return self.template.format(price=format_decimal(to_decimal(price)),
+                                    quantity=format_decimal(to_decimal(quantity)),
+                                    timestamp=timestamp)
+
+    def submit(self, price, quantity):
+        """Sign and post the order.
+
+        :returns: API response, see BinanceLite.create_order, None on signing error
+
+        :raises: BinanceRequestException, BinanceAPIException, BinanceOrderException
+        """
+        client = self.client
+        if self.check:
+            order = client.get_symbol_info(self.params['symbol']).check_limit_order(quantity, price)
+            price, quantity = order['price'], order['quantity']
+        client.limiter.acquire('post', self.path)
+        recv_window = client._recv_window()
+        if recv_window != self.recv_window:
+            # a clock sync tightened or widened the window
+            self.build(recv_window)
+
+        timings = {}
+        start = time.perf_counter()
+        query_string = self.query_string(price, quantity, client._timestamp())
+        signature = client._sign_query_string(query_string)
+        timings['sign'] = time.perf_counter() - start
+        if not signature:
+            print('Signature error!')
+            return None
+        # same requests options as create_order
+        kwargs = {'timeout': 10}
+        if client._requests_params:
+            kwargs.update(client._requests_params)
+        headers = dict(kwargs.get('headers') or {})
+        headers['Content-Type'] = FORM_CONTENT_TYPE
+        kwargs['headers'] = headers
+        return client._send('post', self.uri, self.path, timings, start,
+                            data=query_string + '&signature=' + signature, **kwargs)
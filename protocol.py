@@ -0,0 +1,96 @@
+import struct
+
+
+# frame header: op code, request id, payload length
+HEADER = struct.Struct('!BII')
+MAX_PAYLOAD = 1024 * 1024
+
+OP_SIGN = 1
+OP_SIGN_BATCH = 2
+# latency summary of the signer, JSON, empty request payload
+OP_STATS = 3
+OP_ERROR = 255
+
+# separates query strings and signatures in batch payloads
+BATCH_SEPARATOR = b'\n'
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class SignerError(Exception):
+    """Error reported by the signer in an OP_ERROR frame."""
+    pass
+
+
+def pack_frame(op, request_id, payload=b''):
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError('Payload too large: {} bytes.'.format(len(payload)))
+    return HEADER.pack(op, request_id, len(payload)) + payload
+
+
+def recv_exactly(sock, size):
+    """Read exactly size bytes from sock.
+
+    :return: bytes or None if the peer closed the connection before sending anything
+    """
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ProtocolError('Connection closed in the middle of a frame.')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_header(sock):
+    """Read a frame header from sock.
+
+    :return: (op, request_id, length) or None if the connection was closed
+    """
+    header = recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    op, request_id, length = HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise ProtocolError('Payload too large: {} bytes.'.format(length))
+    return op, request_id, length
+
+
+def recv_payload(sock, length):
+    payload = recv_exactly(sock, length) if length else b''
+    if payload is None:
+        raise ProtocolError('Connection closed in the middle of a frame.')
+    return payload
+
+
+def recv_frame(sock):
+    """Read one frame from sock.
+
+    :return: (op, request_id, payload) or None if the connection was closed
+    """
+    header = recv_header(sock)
+    if header is None:
+        return None
+    op, request_id, length = header
+    return op, request_id, recv_payload(sock, length)
+
+
+def pack_batch(items):
+    """Join strings into one batch payload."""
+    encoded = [item.encode() for item in items]
+    if any(BATCH_SEPARATOR in item for item in encoded):
+        raise ProtocolError('Batch item contains a separator.')
+    return BATCH_SEPARATOR.join(encoded)
+
+
+def unpack_batch(payload):
+    """Split a batch payload into strings."""
+    if not payload:
+        return []
+    return payload.decode().split(BATCH_SEPARATOR.decode())
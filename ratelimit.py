@@ -0,0 +1,215 @@
+import threading
+import time
+
+
+class WeightBudget(object):
+    """Token bucket of Binance request weight, refilled at weight_per_minute.
+    Thread-safe, acquire blocks until the requested weight is available.
+    """
+
+    def __init__(self, weight_per_minute, burst=None):
+        """
+        :param weight_per_minute: refill rate
+        :param burst: bucket size, default: weight_per_minute
+        """
+        self.rate = weight_per_minute / 60.0
+        self.capacity = burst if burst is not None else weight_per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        weight = min(weight, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = (weight - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, weight=1):
+        """:return: True if the weight was taken, False if the budget is short, without waiting"""
+        weight = min(weight, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= weight:
+                self._tokens -= weight
+                return True
+            return False
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def sync(self, used):
+        """Lower the budget to what the server reports as left, used of capacity is taken."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, max(0.0, self.capacity - used))
+
+    def release(self, weight):
+        """Give back weight that was taken but not used."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + weight)
+
+    def drain(self):
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+# request weight of the endpoints in use, paths relative to the api version
+ENDPOINT_WEIGHTS = {
+    'ping': 1,
+    'time': 1,
+    'exchangeInfo': 20,
+    'klines': 2,
+    'ticker/price': 2,
+    'account': 20,
+    'order': 1,
+    'order/test': 1,
+    'openOrders': 6,
+    'userDataStream': 2,
+}
+
+# depth weight by limit, up to the key
+DEPTH_WEIGHTS = [(100, 5), (500, 25), (1000, 50), (5000, 250)]
+
+# endpoints counted against the order limits when posted
+ORDER_PATHS = ('order',)
+
+
+def request_weight(method, path, params=None):
+    """:return: request weight of a call, 1 for unknown endpoints"""
+    params = params or {}
+    if path == 'depth':
+        limit = int(params.get('limit', 100))
+        for max_limit, weight in DEPTH_WEIGHTS:
+            if limit <= max_limit:
+                return weight
+        return DEPTH_WEIGHTS[-1][1]
+    if path == 'openOrders' and method == 'get' and not params.get('symbol'):
+        return 80
+    if path == 'ticker/price' and not params.get('symbol'):
+        return 4
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+class RateLimiter(object):
+    """Client side limits of request weight and order count, shared by every BinanceLite.
+    Thread-safe.
+
+    Weight is taken before each request. Responses sync the budgets with the used weight and
+    order count the server reports in its X-MBX-USED-WEIGHT-* and X-MBX-ORDER-COUNT-* headers,
+    so requests of other processes on the same IP or account are accounted for. After a 429 or
+    418 all requests wait for Retry-After.
+    """
+
+    def __init__(self, weight_per_minute=1200, orders_per_10_seconds=50, orders_per_day=160000, safety=0.9):
+        """
+        :param weight_per_minute: REQUEST_WEIGHT limit per minute
+        :param orders_per_10_seconds: ORDERS limit per 10 seconds
+        :param orders_per_day: ORDERS limit per day
+        :param safety: share of the limits to use
+        """
+        # keyed by the interval suffix of the headers
+        self.weight_budgets = {
+            '1M': WeightBudget(weight_per_minute * safety),
+        }
+        self.order_budgets = {
+            '10S': WeightBudget(orders_per_10_seconds * safety * 6, burst=orders_per_10_seconds * safety),
+            '1D': WeightBudget(orders_per_day * safety / 1440.0, burst=orders_per_day * safety),
+        }
+        self.safety = safety
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, method, path, params=None):
+        """Block until the weight of the request, and an order if it places one, is available."""
+        self._wait_ban()
+        weight = request_weight(method, path, params)
+        for budget in self.weight_budgets.values():
+            budget.acquire(weight)
+        if method == 'post' and path in ORDER_PATHS:
+            for budget in self.order_budgets.values():
+                budget.acquire(1)
+
+    def try_acquire(self, method, path, params=None):
+        """:return: True if the weight, and an order if the request places one, was taken,
+            False without waiting and without taking anything if it is not available
+        """
+        if self.blocked_for() > 0:
+            return False
+        weight = request_weight(method, path, params)
+        budgets = [(budget, weight) for budget in self.weight_budgets.values()]
+        if method == 'post' and path in ORDER_PATHS:
+            budgets += [(budget, 1) for budget in self.order_budgets.values()]
+        for i, (budget, amount) in enumerate(budgets):
+            if not budget.try_acquire(amount):
+                for taken, taken_amount in budgets[:i]:
+                    taken.release(taken_amount)
+                return False
+        return True
+
+    def batch_size(self, method, path, params=None):
+        """:return: how many such requests fit in the smallest full budget, at least 1"""
+        weight = request_weight(method, path, params)
+        size = min(int(budget.capacity // weight) for budget in self.weight_budgets.values())
+        if method == 'post' and path in ORDER_PATHS:
+            size = min([size] + [int(budget.capacity) for budget in self.order_budgets.values()])
+        return max(1, size)
+
+    def update(self, response):
+        """Sync the budgets with the headers of a response, start waiting on 429 and 418."""
+        headers = response.headers
+        for name, value in headers.items():
+            name = name.upper()
+            if name.startswith('X-MBX-USED-WEIGHT-'):
+                budget = self.weight_budgets.get(name[len('X-MBX-USED-WEIGHT-'):])
+            elif name.startswith('X-MBX-ORDER-COUNT-'):
+                budget = self.order_budgets.get(name[len('X-MBX-ORDER-COUNT-'):])
+            else:
+                continue
+            if budget is not None:
+                try:
+                    budget.sync(int(value))
+                except ValueError:
+                    pass
+        if response.status_code in (418, 429):
+            try:
+                retry_after = float(headers.get('Retry-After', 60))
+            except ValueError:
+                retry_after = 60.0
+            with self._lock:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            for budget in self.weight_budgets.values():
+                budget.drain()
+            print('rate limited ({}), waiting {}s'.format(response.status_code, retry_after))
+
+    def blocked_for(self):
+        """:return: seconds left until requests may be sent again after a 429 or 418"""
+        with self._lock:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+    def _wait_ban(self):
+        wait = self.blocked_for()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.blocked_for()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """:return: RateLimiter shared by all clients of the process"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
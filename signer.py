@@ -1,21 +1,34 @@
 import socket
-import hashlib
-import hmac
+import json
 import getpass
 import os
 from log import Log
 from encryption import Mayes
+from signing import generate_signature
+from metrics import LatencyStats
 import time
+import threading
+import protocol
 
 
+HOST = '173.68.217.147'
+PORT = 18956
+BACKLOG = 64
+MAX_CLIENTS = 32
+
 ACCEPTED_IPS = [
     '173.68.217.188'  # bpi
                 ]
 
 
 class Signer:
-    def __init__(self):
+    def __init__(self, max_clients=MAX_CLIENTS):
         self.log = Log()
+        self._log_lock = threading.Lock()
+        self._clients = threading.BoundedSemaphore(max_clients)
+        self._server_socket = None
+        self._running = False
+        self.latency = LatencyStats()
         mayes = Mayes()
         passwd = getpass.getpass()
         if os.path.isfile('constants'):
@@ -46,51 +59,125 @@ class Signer:
         del secret
 
     def run_server(self):
+        """Accept clients until stop() is called. Every connection is served by its own thread,
+        so trading processes do not wait for each other.
+
+        :return: None if the server failed, True after stop()
+        """
         try:
-            host = "173.68.217.147"
-            port = 18956
-            mySocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            mySocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            mySocket.bind((host, port))
-            mySocket.listen(1)
-            # print('waiting for connection...')
-            conn, addr = mySocket.accept()
-            start = time.time()
-            info = 'Connection from: {}'.format(addr)
-            print(info)
-            self.log.append(info)
-            # filter ip
-            if addr[0] not in ACCEPTED_IPS:
-                info = 'UNKNOWN IP! REJECTING CONNECTION.'
-                print(info)
-                self.log.append(info)
-                conn.close()
-                mySocket.close()
-                return False
-            data = conn.recv(256).decode()
-            info = 'Received data: {}'.format(data)
-            print(info)
-            self.log.append(info)
-            signature = self._generate_signature(data)
-            signature_bytes = signature.encode()
-            info = 'replying signature...'
-            print(info)
-            self.log.append(info)
-            conn.send(signature_bytes)
-            conn.close()
-            info = 'Execution time: {}'.format(round(time.time() - start), 4)
-            print(info)
-            self.log.append(info)
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind((HOST, PORT))
+            server_socket.listen(BACKLOG)
+            self._server_socket = server_socket
+            self._running = True
+            self._report('Listening on {}:{}'.format(HOST, PORT))
+            while self._running:
+                try:
+                    conn, addr = server_socket.accept()
+                except OSError:
+                    if not self._running:
+                        break
+                    raise
+                accepted = time.perf_counter()
+                self._report('Connection from: {}'.format(addr))
+                # filter ip
+                if addr[0] not in ACCEPTED_IPS:
+                    self._report('UNKNOWN IP! REJECTING CONNECTION.', is_error=True)
+                    conn.close()
+                    continue
+                if not self._clients.acquire(blocking=False):
+                    self._report('Too many clients. Rejecting connection from: {}'.format(addr), is_error=True)
+                    conn.close()
+                    continue
+                thread = threading.Thread(target=self._serve_connection, args=(conn, addr), daemon=True)
+                thread.start()
+                self.latency.record('accept', time.perf_counter() - accepted)
             return True
         except Exception as ex:
-            info = 'Connection error: {}'.format(ex)
-            print(info)
-            self.log.append(info)
+            self._report('Connection error: {}'.format(ex), is_error=True)
             return None
+        finally:
+            self._running = False
+            if self._server_socket:
+                self._server_socket.close()
+                self._server_socket = None
+
+    def stop(self):
+        self._running = False
+        server_socket = self._server_socket
+        if server_socket:
+            try:
+                # wakes up accept()
+                server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _serve_connection(self, conn, addr):
+        try:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # serve requests until the client disconnects
+            with conn:
+                while True:
+                    header = protocol.recv_header(conn)
+                    if header is None:
+                        break
+                    # time the request from the moment its header arrived
+                    start = time.perf_counter()
+                    op, request_id, length = header
+                    payload = protocol.recv_payload(conn, length)
+                    received = time.perf_counter()
+                    self.latency.record('receive', received - start)
+                    frame = self._handle_frame(op, request_id, payload)
+                    send_start = time.perf_counter()
+                    conn.sendall(frame)
+                    done = time.perf_counter()
+                    self.latency.record('send', done - send_start)
+                    self.latency.record('total', done - start)
+                    self._report('Execution time: {:.6f}'.format(done - start))
+            self._report('Connection closed: {}'.format(addr))
+        except Exception as ex:
+            self._report('Connection error {}: {}'.format(addr, ex), is_error=True)
+        finally:
+            self._clients.release()
+
+    def _report(self, info, is_error=False):
+        with self._log_lock:
+            print(info)
+        self.log.append(info, is_error)
+
+    def get_latency_stats(self):
+        """Latency of the accept, receive, hmac, send and total phases, also served to clients
+        as OP_STATS.
+
+        :return: dict of phase: {'count', 'p50', 'p99', 'max'}, times in milliseconds
+        """
+        return self.latency.summary()
+
+    def _handle_frame(self, op, request_id, payload):
+        if op == protocol.OP_SIGN:
+            data = payload.decode()
+            self._report('Received data: {}'.format(data))
+            with self.latency.timer('hmac'):
+                reply = self._generate_signature(data).encode()
+            self._report('replying signature...')
+        elif op == protocol.OP_SIGN_BATCH:
+            batch = protocol.unpack_batch(payload)
+            for data in batch:
+                self._report('Received data: {}'.format(data))
+            with self.latency.timer('hmac'):
+                reply = protocol.pack_batch([self._generate_signature(data) for data in batch])
+            self._report('replying {} signatures...'.format(len(batch)))
+        elif op == protocol.OP_STATS:
+            reply = json.dumps(self.get_latency_stats()).encode()
+        else:
+            info = 'Unknown op code: {}'.format(op)
+            self._report(info, is_error=True)
+            return protocol.pack_frame(protocol.OP_ERROR, request_id, info.encode())
+        return protocol.pack_frame(op, request_id, reply)
 
     def _generate_signature(self, query_string):
-        m = hmac.new(self.secret.encode('utf-8'),query_string.encode('utf-8'),hashlib.sha256)
-        return m.hexdigest()
+        return generate_signature(self.secret, query_string)
 
     @staticmethod
     def test_server():
@@ -119,8 +206,6 @@ if __name__ == '__main__':
     signer = Signer()
     while True:
         result = signer.run_server()
-        if not result:
-            if result is False:
-                time.sleep(10)  # unknown connection rejected
-            elif result is None:
-                time.sleep(1)  # some error
\ No newline at end of file
+        if result:
+            break  # stopped
+        time.sleep(1)  # some error, bind again
\ No newline at end of file
@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+import getpass
+import connection
+
+
+def generate_signature(secret, query_string):
+    m = hmac.new(secret.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256)
+    return m.hexdigest()
+
+
+class SignerBackend(object):
+    """Computes signatures of request query strings for BinanceLite."""
+
+    def sign(self, query_string):
+        """:return: hex signature of query_string"""
+        raise NotImplementedError
+
+    def sign_batch(self, query_strings):
+        """:return: list of hex signatures in the order of query_strings"""
+        return [self.sign(query_string) for query_string in query_strings]
+
+
+class RemoteSigner(SignerBackend):
+    """Signs on the remote signer server (signer.py), the secret never leaves that host."""
+
+    def __init__(self, client=None):
+        self.client = client if client is not None else connection.get_client()
+
+    def sign(self, query_string):
+        return self.client.sign(query_string)
+
+    def sign_batch(self, query_strings):
+        return self.client.sign_batch(query_strings)
+
+
+class AsyncRemoteSigner(SignerBackend):
+    """RemoteSigner for AsyncBinanceLite, sign and sign_batch are coroutines."""
+
+    def __init__(self, client=None):
+        if client is None:
+            # keeps asyncio out of the sync import path
+            import async_connection
+            client = async_connection.AsyncSignerClient()
+        self.client = client
+
+    async def sign(self, query_string):
+        return await self.client.sign(query_string)
+
+    async def sign_batch(self, query_strings):
+        return await self.client.sign_batch(query_strings)
+
+
+class LocalSigner(SignerBackend):
+    """Signs in-process. The secret is decrypted from the constants file once, at construction.
+    Use only on hosts that can safely hold the secret.
+    """
+
+    def __init__(self, passwd=None):
+        # pycryptodome is only needed here
+        from encryption import Mayes
+        if passwd is None:
+            passwd = getpass.getpass()
+        secret = Mayes().read_secret(passwd)
+        passwd = None
+        del passwd
+        if not secret:
+            raise ValueError('Cannot read secret file.')
+        self._secret = secret
+
+    def sign(self, query_string):
+        return generate_signature(self._secret, query_string)
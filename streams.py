@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+import itertools
+import websocket
+
+
+STREAM_URL = 'wss://stream.binance.com:9443'
+
+
+def ticker_stream(symbol):
+    return '{}@ticker'.format(symbol.lower())
+
+
+def trade_stream(symbol):
+    return '{}@trade'.format(symbol.lower())
+
+
+def kline_stream(symbol, interval):
+    return '{}@kline_{}'.format(symbol.lower(), interval)
+
+
+def depth_stream(symbol, speed='100ms'):
+    """Diff depth stream, the feed of order_book.LocalOrderBook"""
+    return '{}@depth@{}'.format(symbol.lower(), speed)
+
+
+class StreamClient(object):
+    """Market data streams multiplexed over one WebSocket connection to the combined stream
+    endpoint. Every message is delivered to the callback and/or queue registered for its stream,
+    from the client thread. The connection is re-established with backoff when it drops and
+    all streams are subscribed again.
+
+    Messages sent while the connection was down are lost. A subscriber that keeps state from its
+    stream passes on_subscribed, called once the server has confirmed the subscription, on the
+    first connect and after every reconnect, and on_disconnect, called when the connection drops.
+
+    url can point to a local stand-in for testing.
+
+    .. code-block:: python
+
+        client = StreamClient()
+        client.subscribe(ticker_stream('BTCUSDT'), callback=print)
+        client.subscribe(depth_stream('BTCUSDT'), callback=book.on_depth_event)
+        client.start()
+
+    """
+
+    def __init__(self, url=STREAM_URL, reconnect_delay=1, max_reconnect_delay=60, ping_interval=180):
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        self._handlers = {}
+        self._ws = None
+        self._thread = None
+        self._running = False
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, stream, callback=None, queue=None, on_subscribed=None, on_disconnect=None):
+        """Deliver messages of stream to callback(data) and/or queue.put(data).
+
+        :param on_subscribed: optional - callable(stream), called from the client thread when the
+            subscription is live, again after every reconnect
+        :param on_disconnect: optional - callable(stream), called from the client thread when the
+            connection drops, messages are lost until on_subscribed is called again
+        """
+        with self._lock:
+            self._handlers.setdefault(stream, []).append((callback, queue, on_subscribed, on_disconnect))
+            ws = self._ws
+        if ws is not None:
+            self._send(ws, 'SUBSCRIBE', [stream])
+
+    def unsubscribe(self, stream):
+        with self._lock:
+            self._handlers.pop(stream, None)
+            ws = self._ws
+        if ws is not None:
+            self._send(ws, 'UNSUBSCRIBE', [stream])
+
+    def start(self):
+        """Connect in a background thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while self._running:
+            started = time.monotonic()
+            ws = websocket.WebSocketApp(self.url + '/stream',
+                                        on_open=self._on_open,
+                                        on_message=self._on_message,
+                                        on_error=self._on_error,
+                                        on_close=self._on_close)
+            ws.run_forever(ping_interval=self.ping_interval)
+            with self._lock:
+                self._ws = None
+                self._pending.clear()
+                streams = list(self._handlers)
+            self._notify(streams, 3)
+            if not self._running:
+                break
+            # a connection that lasted a while resets the backoff
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            print('stream disconnected, reconnecting in {}s...'.format(delay))
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _on_open(self, ws):
+        with self._lock:
+            self._ws = ws
+            streams = list(self._handlers)
+        if streams:
+            self._send(ws, 'SUBSCRIBE', streams)
+
+    def _on_message(self, ws, message):
+        message = json.loads(message)
+        stream = message.get('stream')
+        if stream is None:
+            self._on_reply(message)
+            return
+        with self._lock:
+            handlers = list(self._handlers.get(stream, ()))
+        data = message['data']
+        for callback, queue, _, _ in handlers:
+            try:
+                if callback is not None:
+                    callback(data)
+                if queue is not None:
+                    queue.put(data)
+            except Exception as ex:
+                print('stream {} handler error: {}'.format(stream, ex))
+
+    def _on_reply(self, message):
+        with self._lock:
+            streams = self._pending.pop(message.get('id'), None)
+        if streams is None:
+            return  # reply to unsubscribe
+        if message.get('error') is not None:
+            print('stream SUBSCRIBE error: {}'.format(message['error']))
+            return
+        self._notify(streams, 2)
+
+    def _notify(self, streams, index):
+        """Call the on_subscribed (index 2) or on_disconnect (index 3) listeners of streams."""
+        for stream in streams:
+            with self._lock:
+                listeners = [handler[index] for handler in self._handlers.get(stream, ()) if handler[index]]
+            for listener in listeners:
+                try:
+                    listener(stream)
+                except Exception as ex:
+                    print('stream {} listener error: {}'.format(stream, ex))
+
+    def _on_error(self, ws, error):
+        print('stream error: {}'.format(error))
+
+    def _on_close(self, ws, *args):
+        with self._lock:
+            if self._ws is ws:
+                self._ws = None
+
+    def _send(self, ws, method, streams):
+        request_id = next(self._ids)
+        if method == 'SUBSCRIBE':
+            # the reply with this id confirms the subscription
+            with self._lock:
+                self._pending[request_id] = streams
+        try:
+            ws.send(json.dumps({'method': method, 'params': streams, 'id': request_id}))
+        except Exception as ex:
+            # streams are subscribed again on reconnect
+            print('stream {} error: {}'.format(method, ex))
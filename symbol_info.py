@@ -0,0 +1,161 @@
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN
+from exceptions import BinanceOrderException, BinanceOrderMinAmountException, BinanceOrderMinPriceException, \
+    BinanceOrderMinTotalException, BinanceOrderUnknownSymbolException, BinanceOrderInactiveSymbolException
+
+
+def to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def format_decimal(value):
+    """Plain notation, str(Decimal) would switch to exponent notation for small values."""
+    return format(value, 'f')
+
+
+class SymbolInfo(object):
+    """Trading rules of a symbol, parsed from its exchangeInfo entry.
+    Quantizes prices and quantities and checks orders against the filters locally.
+    """
+
+    def __init__(self, info):
+        self.symbol = info['symbol']
+        self.status = info['status']
+        self.quote_precision = int(info.get('quoteAssetPrecision', info.get('quotePrecision', 8)))
+        self.tick_size = self.min_price = self.max_price = Decimal(0)
+        self.step_size = self.min_qty = self.max_qty = Decimal(0)
+        self.market_step_size = self.market_min_qty = self.market_max_qty = Decimal(0)
+        self.min_notional = Decimal(0)
+        self.min_notional_market = False
+        for f in info.get('filters', []):
+            filter_type = f['filterType']
+            if filter_type == 'PRICE_FILTER':
+                self.min_price = Decimal(f['minPrice'])
+                self.max_price = Decimal(f['maxPrice'])
+                self.tick_size = Decimal(f['tickSize'])
+            elif filter_type == 'LOT_SIZE':
+                self.min_qty = Decimal(f['minQty'])
+                self.max_qty = Decimal(f['maxQty'])
+                self.step_size = Decimal(f['stepSize'])
+            elif filter_type == 'MARKET_LOT_SIZE':
+                self.market_min_qty = Decimal(f['minQty'])
+                self.market_max_qty = Decimal(f['maxQty'])
+                self.market_step_size = Decimal(f['stepSize'])
+            elif filter_type == 'MIN_NOTIONAL':
+                self.min_notional = Decimal(f['minNotional'])
+                self.min_notional_market = f.get('applyToMarket', True)
+            elif filter_type == 'NOTIONAL':
+                self.min_notional = Decimal(f['minNotional'])
+                self.min_notional_market = f.get('applyMinToMarket', True)
+
+    def quantize_price(self, price):
+        return self._floor(to_decimal(price), self.tick_size)
+
+    def quantize_quantity(self, quantity, market=False):
+        step_size = self.market_step_size if market and self.market_step_size else self.step_size
+        return self._floor(to_decimal(quantity), step_size)
+
+    def quantize_quote_quantity(self, quote_quantity):
+        return self._floor(to_decimal(quote_quantity), Decimal(1).scaleb(-self.quote_precision))
+
+    def check_limit_order(self, quantity, price):
+        """Quantize and check a limit order.
+
+        :return: dict with quantity and price strings to send
+        :raises: BinanceOrderException and its subclasses
+        """
+        self._check_status()
+        price = self.quantize_price(price)
+        quantity = self.quantize_quantity(quantity)
+        if price <= 0 or (self.min_price and price < self.min_price):
+            raise BinanceOrderMinPriceException(format_decimal(self.min_price or self.tick_size))
+        if self.max_price and price > self.max_price:
+            raise BinanceOrderException(-1013, 'Price must be at most %s' % format_decimal(self.max_price))
+        self._check_quantity(quantity, self.min_qty, self.max_qty, self.step_size)
+        if price * quantity < self.min_notional:
+            raise BinanceOrderMinTotalException(format_decimal(self.min_notional))
+        return {'quantity': format_decimal(quantity), 'price': format_decimal(price)}
+
+    def check_market_order(self, quantity=None, quote_quantity=None):
+        """Quantize and check a market order given by base quantity or by quote quantity.
+
+        :return: dict with quantity or quoteOrderQty string to send
+        :raises: BinanceOrderException and its subclasses
+        """
+        self._check_status()
+        if quote_quantity is not None:
+            quote_quantity = self.quantize_quote_quantity(quote_quantity)
+            if quote_quantity <= 0 or (self.min_notional_market and quote_quantity < self.min_notional):
+                raise BinanceOrderMinTotalException(format_decimal(self.min_notional))
+            return {'quoteOrderQty': format_decimal(quote_quantity)}
+        quantity = self.quantize_quantity(quantity, market=True)
+        if self.market_step_size:
+            self._check_quantity(quantity, self.market_min_qty, self.market_max_qty, self.market_step_size)
+        else:
+            self._check_quantity(quantity, self.min_qty, self.max_qty, self.step_size)
+        return {'quantity': format_decimal(quantity)}
+
+    def _check_status(self):
+        if self.status != 'TRADING':
+            raise BinanceOrderInactiveSymbolException(self.symbol)
+
+    @staticmethod
+    def _check_quantity(quantity, min_qty, max_qty, step_size):
+        if quantity <= 0:
+            raise BinanceOrderMinAmountException(format_decimal(step_size))
+        if min_qty and quantity < min_qty:
+            raise BinanceOrderException(-1013, 'Quantity must be at least %s' % format_decimal(min_qty))
+        if max_qty and quantity > max_qty:
+            raise BinanceOrderException(-1013, 'Quantity must be at most %s' % format_decimal(max_qty))
+
+    @staticmethod
+    def _floor(value, step):
+        if not step:
+            return value
+        return ((value / step).to_integral_value(rounding=ROUND_DOWN) * step).quantize(step)
+
+
+class SymbolInfoCache(object):
+    """exchangeInfo of all symbols, loaded on first use and refreshed after ttl seconds.
+    Thread-safe.
+    """
+
+    def __init__(self, client, ttl=3600):
+        """
+        :param client: BinanceLite
+        :param ttl: seconds after which exchangeInfo is downloaded again
+        """
+        self.client = client
+        self.ttl = ttl
+        self._symbols = {}
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        """:return: SymbolInfo
+        :raises: BinanceOrderUnknownSymbolException, BinanceRequestException, BinanceAPIException
+        """
+        with self._lock:
+            if self._stale():
+                self._update(self.client.get_exchange_info())
+            return self._lookup(symbol)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = None
+
+    def _stale(self):
+        return self._loaded is None or time.monotonic() - self._loaded > self.ttl
+
+    def _update(self, exchange_info):
+        self._symbols = {info['symbol']: SymbolInfo(info) for info in exchange_info['symbols']}
+        self._loaded = time.monotonic()
+
+    def _lookup(self, symbol):
+        info = self._symbols.get(symbol)
+        if info is None:
+            raise BinanceOrderUnknownSymbolException(symbol)
+        return info
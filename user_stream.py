@@ -0,0 +1,234 @@
+import threading
+from streams import StreamClient
+
+
+# order statuses after which an order is no longer open
+CLOSED_ORDER_STATUSES = ('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH')
+
+
+class AccountCache(object):
+    """Balances and open orders kept up to date from user data stream events. Thread-safe.
+
+    Balances and orders have the shape of the get_account balances and get_open_orders entries.
+    Between reset and load, events are buffered and replayed on top of the loaded snapshot.
+    """
+
+    def __init__(self):
+        self.synced = False
+        self._balances = {}
+        self._open_orders = {}
+        self._buffer = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Mark the cache unsynced, e.g. when events may have been lost, and buffer events until
+        the next load.
+
+        :returns: generation to pass to load, a later reset makes that load void
+        """
+        with self._lock:
+            self.synced = False
+            self._buffer = []
+            self._generation += 1
+            return self._generation
+
+    def load(self, account, open_orders, generation=None):
+        """Seed the cache from get_account and get_open_orders responses.
+
+        :returns: True if loaded, False if the cache was reset after generation was taken
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._balances = {balance['asset']: {'asset': balance['asset'],
+                                                 'free': balance['free'],
+                                                 'locked': balance['locked']}
+                              for balance in account['balances']}
+            self._open_orders = {order['orderId']: dict(order) for order in open_orders}
+            buffered, self._buffer = self._buffer or [], None
+            for event in buffered:
+                self._apply(event)
+            self.synced = True
+            return True
+
+    def get_account(self):
+        """:return: dict with balances, like the get_account response"""
+        with self._lock:
+            return {'balances': [dict(balance) for balance in self._balances.values()]}
+
+    def get_open_orders(self, symbol=None):
+        """:return: list of open orders, like the get_open_orders response"""
+        with self._lock:
+            return [dict(order) for order in self._open_orders.values()
+                    if symbol is None or order['symbol'] == symbol]
+
+    def on_event(self, event):
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.append(event)
+                return
+            self._apply(event)
+
+    def _apply(self, event):
+        event_type = event.get('e')
+        if event_type == 'outboundAccountPosition':
+            self._on_account_position(event)
+        elif event_type == 'balanceUpdate':
+            self._on_balance_update(event)
+        elif event_type == 'executionReport':
+            self._on_execution_report(event)
+
+    def _on_account_position(self, event):
+        for balance in event['B']:
+            self._balances[balance['a']] = {'asset': balance['a'], 'free': balance['f'], 'locked': balance['l']}
+
+    def _on_balance_update(self, event):
+        # deposits and withdrawals, the following outboundAccountPosition carries the totals
+        balance = self._balances.setdefault(event['a'], {'asset': event['a'], 'free': '0', 'locked': '0'})
+        balance['free'] = str(float(balance['free']) + float(event['d']))
+
+    def _on_execution_report(self, event):
+        if event['X'] in CLOSED_ORDER_STATUSES:
+            self._open_orders.pop(event['i'], None)
+            return
+        self._open_orders[event['i']] = {
+            'symbol': event['s'],
+            'orderId': event['i'],
+            'clientOrderId': event['c'],
+            'price': event['p'],
+            'origQty': event['q'],
+            'executedQty': event['z'],
+            'cummulativeQuoteQty': event['Z'],
+            'status': event['X'],
+            'timeInForce': event['f'],
+            'type': event['o'],
+            'side': event['S'],
+            'stopPrice': event['P'],
+            'icebergQty': event['F'],
+            'time': event['O'],
+            'updateTime': event['E'],
+        }
+
+
+class UserDataStream(object):
+    """Opens a user data stream, keeps its listen key alive and applies its events to an
+    AccountCache. Once the subscription is live, BinanceLite.get_assets_balance and
+    get_open_orders are served from the cache.
+
+    The cache is seeded when the subscription is confirmed, and again after every reconnect of
+    the stream client. While the stream is down or the cache is seeding, the client falls back
+    to requests.
+
+    .. code-block:: python
+
+        user_stream = UserDataStream(client)
+        user_stream.start()
+        client.get_assets_balance()  # no signature, no request
+
+    """
+
+    def __init__(self, client, stream_client=None, keepalive_interval=30 * 60):
+        """
+        :param client: BinanceLite
+        :param stream_client: streams.StreamClient to subscribe on, a new one is started if not set
+        :param keepalive_interval: seconds between listen key keepalives, the key expires after 60 minutes
+        """
+        self.client = client
+        self.own_stream_client = stream_client is None
+        self.stream_client = stream_client if stream_client is not None else StreamClient()
+        self.keepalive_interval = keepalive_interval
+        self.cache = AccountCache()
+        self.listen_key = None
+        self._expired = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._open()
+        if self.own_stream_client:
+            self.stream_client.start()
+        self._thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+        self._thread.start()
+        self.client.account_cache = self.cache
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self.client.account_cache is self.cache:
+            self.client.account_cache = None
+        self.cache.reset()
+        if self.listen_key is not None:
+            self.stream_client.unsubscribe(self.listen_key)
+            try:
+                self.client.stream_close(self.listen_key)
+            except Exception as ex:
+                print('user stream close error: {}'.format(ex))
+            self.listen_key = None
+        if self.own_stream_client:
+            self.stream_client.stop()
+
+    def _open(self):
+        self.cache.reset()
+        self._expired = False
+        self.listen_key = self.client.stream_get_listen_key()['listenKey']
+        # seeded by _on_subscribed once the subscription is live
+        self.stream_client.subscribe(self.listen_key, callback=self._on_event,
+                                     on_subscribed=self._on_subscribed, on_disconnect=self._on_disconnect)
+
+    def _renew(self):
+        if self.listen_key is not None:
+            self.stream_client.unsubscribe(self.listen_key)
+        self._open()
+
+    def _on_subscribed(self, listen_key):
+        if listen_key != self.listen_key:
+            return
+        # events arriving from now on are buffered until the seed is loaded, the requests do not
+        # hold up the stream client thread
+        generation = self.cache.reset()
+        threading.Thread(target=self._seed, args=(generation,), daemon=True).start()
+
+    def _on_disconnect(self, listen_key):
+        if listen_key == self.listen_key:
+            self.cache.reset()
+
+    def _seed(self, generation):
+        try:
+            self.cache.load(self.client.get_account(), self.client.get_open_orders(), generation)
+        except Exception as ex:
+            # the cache stays unsynced, the keepalive thread renews the stream
+            print('user stream seed error: {}'.format(ex))
+            self._expire()
+
+    def _expire(self):
+        """Have the keepalive thread open a new stream."""
+        self.cache.reset()
+        self._expired = True
+        self._wake.set()
+
+    def _on_event(self, event):
+        if event.get('e') == 'listenKeyExpired':
+            self._expire()
+            return  # renewed by the keepalive thread
+        self.cache.on_event(event)
+
+    def _keepalive_loop(self):
+        while True:
+            self._wake.wait(5 if self._expired else self.keepalive_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                if self._expired:
+                    self._renew()
+                    # at most one renewal every 5 s while seeding keeps failing
+                    self._stop.wait(5)
+                else:
+                    self.client.stream_keepalive(self.listen_key)
+            except Exception as ex:
+                print('user stream keepalive error: {}'.format(ex))
+                self.cache.reset()
+                self._expired = True